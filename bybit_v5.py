@@ -2,10 +2,83 @@ import time
 import hmac
 import hashlib
 import json
+import threading
+from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
 import requests
+from requests.adapters import HTTPAdapter
 from websocket import WebSocketApp
 
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json works the same
+    orjson = None
+
+
+def _dumps(obj: Any) -> str:
+    """Compact JSON; this exact string is both signed and sent."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def _loads(data: Any) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+@dataclass(slots=True)
+class Position:
+    """A /v5/position/list entry with its numeric fields parsed."""
+    symbol: str
+    side: str
+    size: float
+    avg_price: float
+    unrealised_pnl: float
+
+    @classmethod
+    def from_api(cls, p: Dict[str, Any]) -> "Position":
+        return cls(
+            symbol=p.get("symbol") or "",
+            side=p.get("side") or "",
+            size=float(p.get("size") or 0),
+            avg_price=float(p.get("avgPrice") or 0),
+            unrealised_pnl=float(p.get("unrealisedPnl") or 0),
+        )
+
+
+class RateLimiter:
+    """Thread-safe token bucket: `capacity` tokens, refilled at `refill_per_sec`."""
+
+    def __init__(self, capacity: float, refill_per_sec: float):
+        self.capacity = float(capacity)
+        self.rate = float(refill_per_sec)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, n: int = 1) -> None:
+        """Block until n tokens are available, then take them."""
+        with self._cond:
+            while True:
+                self._refill()
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return
+                self._cond.wait((n - self._tokens) / self.rate)
+
+    def limit_to(self, remaining: int) -> None:
+        """Never allow more than the server says is left (X-Bapi-Limit-Status)."""
+        with self._cond:
+            self._refill()
+            self._tokens = min(self._tokens, float(remaining))
+
+
 class BybitV5:
     def __init__(self, api_key: str, api_secret: str, testnet: bool = False, demo: bool = False, recv_window: str = "5000"):
         self.api_key = api_key
@@ -13,15 +86,33 @@ class BybitV5:
         self.recv_window = str(recv_window)
 
         # Demo trading uses different endpoints (paper trading on live market data)
+        # (demo trading has no public stream of its own - it uses mainnet market data)
         if demo:
             self.base = "https://api-demo.bybit.com"
             self.ws   = "wss://stream-demo.bybit.com/v5/private"
+            self.ws_public = "wss://stream.bybit.com/v5/public"
         elif testnet:
             self.base = "https://api-testnet.bybit.com"
             self.ws   = "wss://stream-testnet.bybit.com/v5/private"
+            self.ws_public = "wss://stream-testnet.bybit.com/v5/public"
         else:
             self.base = "https://api.bybit.com"
             self.ws   = "wss://stream.bybit.com/v5/private"
+            self.ws_public = "wss://stream.bybit.com/v5/public"
+        self._public_ws: Optional[WebSocketApp] = None
+
+        # One keep-alive pool shared by all threads (engine I/O pool, entry workers)
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=16))
+
+        # Client-side throttle below Bybit's per-UID limits: order/position
+        # writes ~10/s, reads 50/s
+        self._trade_bucket = RateLimiter(10, 10)
+        self._read_bucket = RateLimiter(50, 50)
+        # URL path -> bucket sized from that endpoint's X-Bapi-Limit headers.
+        # The quota in X-Bapi-Limit-Status is per endpoint, so it only ever
+        # clamps the endpoint that returned it.
+        self._endpoint_buckets: Dict[str, RateLimiter] = {}
 
     # ---------- signing ----------
     def _sign(self, ts: str, recv_window: str, payload: str) -> str:
@@ -44,6 +135,24 @@ class BybitV5:
         """Build sorted query string for GET request signatures."""
         return "&".join(f"{k}={v}" for k, v in sorted(params.items()))
 
+    def _request(self, method: str, bucket: RateLimiter, url: str, **kwargs) -> requests.Response:
+        path = urlsplit(url).path
+        bucket.acquire()
+        endpoint = self._endpoint_buckets.get(path)
+        if endpoint is not None:
+            endpoint.acquire()
+        r = self.session.request(method, url, **kwargs)
+        remaining = r.headers.get("X-Bapi-Limit-Status")
+        if remaining:
+            try:
+                if endpoint is None:
+                    cap = int(r.headers.get("X-Bapi-Limit") or remaining)
+                    endpoint = self._endpoint_buckets.setdefault(path, RateLimiter(cap, cap))
+                endpoint.limit_to(int(remaining))
+            except ValueError:
+                pass
+        return r
+
     def _check(self, data: Dict[str, Any]) -> Dict[str, Any]:
         # Bybit returns retCode/retMsg
         if isinstance(data, dict) and data.get("retCode", 0) not in (0, "0"):
@@ -52,18 +161,18 @@ class BybitV5:
 
     # ---------- Market data ----------
     def last_price(self, category: str, symbol: str) -> float:
-        r = requests.get(f"{self.base}/v5/market/tickers", params={"category": category, "symbol": symbol}, timeout=10)
+        r = self._request("GET", self._read_bucket, f"{self.base}/v5/market/tickers", params={"category": category, "symbol": symbol}, timeout=10)
         r.raise_for_status()
-        data = self._check(r.json())
+        data = self._check(_loads(r.content))
         lst = (data.get("result") or {}).get("list") or []
         if not lst:
             raise RuntimeError("No ticker data")
         return float(lst[0]["lastPrice"])
 
     def instruments_info(self, category: str, symbol: str) -> Dict[str, Any]:
-        r = requests.get(f"{self.base}/v5/market/instruments-info", params={"category": category, "symbol": symbol}, timeout=10)
+        r = self._request("GET", self._read_bucket, f"{self.base}/v5/market/instruments-info", params={"category": category, "symbol": symbol}, timeout=10)
         r.raise_for_status()
-        data = self._check(r.json())
+        data = self._check(_loads(r.content))
         lst = (data.get("result") or {}).get("list") or []
         if not lst:
             raise RuntimeError("No instrument info")
@@ -82,9 +191,9 @@ class BybitV5:
             List of candles, each with: startTime, openPrice, highPrice, lowPrice, closePrice, volume
         """
         params = {"category": category, "symbol": symbol, "interval": interval, "limit": limit}
-        r = requests.get(f"{self.base}/v5/market/kline", params=params, timeout=10)
+        r = self._request("GET", self._read_bucket, f"{self.base}/v5/market/kline", params=params, timeout=10)
         r.raise_for_status()
-        data = self._check(r.json())
+        data = self._check(_loads(r.content))
         raw_list = (data.get("result") or {}).get("list") or []
 
         # Bybit returns: [startTime, openPrice, highPrice, lowPrice, closePrice, volume, turnover]
@@ -106,13 +215,13 @@ class BybitV5:
         params = {"accountType": account_type}
         query_string = self._build_query_string(params)
         # Use query string in URL (not params=) to ensure order matches signature
-        r = requests.get(
+        r = self._request("GET", self._read_bucket,
             f"{self.base}/v5/account/wallet-balance?{query_string}",
             headers=self._headers(query_string),
             timeout=15,
         )
         r.raise_for_status()
-        data = self._check(r.json())
+        data = self._check(_loads(r.content))
         lst = (data.get("result") or {}).get("list") or []
         if not lst:
             raise RuntimeError("No wallet balance")
@@ -128,10 +237,10 @@ class BybitV5:
             "buyLeverage": str(leverage),
             "sellLeverage": str(leverage),
         }
-        payload = json.dumps(body, separators=(",", ":"))
-        r = requests.post(f"{self.base}/v5/position/set-leverage", headers=self._headers(payload), data=payload, timeout=15)
+        payload = _dumps(body)
+        r = self._request("POST", self._trade_bucket, f"{self.base}/v5/position/set-leverage", headers=self._headers(payload), data=payload, timeout=15)
         r.raise_for_status()
-        data = r.json()
+        data = _loads(r.content)
         # 110043 = "not modified" - leverage already set to same value
         if data.get("retCode") == 110043:
             return data
@@ -149,10 +258,10 @@ class BybitV5:
             "buyLeverage": "10",  # Required when switching mode
             "sellLeverage": "10",
         }
-        payload = json.dumps(body, separators=(",", ":"))
-        r = requests.post(f"{self.base}/v5/position/switch-isolated", headers=self._headers(payload), data=payload, timeout=15)
+        payload = _dumps(body)
+        r = self._request("POST", self._trade_bucket, f"{self.base}/v5/position/switch-isolated", headers=self._headers(payload), data=payload, timeout=15)
         r.raise_for_status()
-        data = r.json()
+        data = _loads(r.content)
         # 110026 = "not modified" - already in this mode
         if data.get("retCode") in (110026, 110043):
             return data
@@ -160,27 +269,51 @@ class BybitV5:
 
     # ---------- Orders ----------
     def place_order(self, body: Dict[str, Any]) -> Dict[str, Any]:
-        payload = json.dumps(body, separators=(",", ":"))
-        r = requests.post(f"{self.base}/v5/order/create", headers=self._headers(payload), data=payload, timeout=15)
+        payload = _dumps(body)
+        r = self._request("POST", self._trade_bucket, f"{self.base}/v5/order/create", headers=self._headers(payload), data=payload, timeout=15)
         r.raise_for_status()
-        return self._check(r.json())
+        return self._check(_loads(r.content))
+
+    def place_batch_order(self, category: str, orders: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Create several orders in one request (linear: max 20).
+
+        result.list and retExtInfo.list are in request order; a per-order
+        failure shows up as a non-zero retExtInfo code, not as an exception.
+        """
+        body = {"category": category, "request": orders}
+        payload = _dumps(body)
+        r = self._request("POST", self._trade_bucket, f"{self.base}/v5/order/create-batch", headers=self._headers(payload), data=payload, timeout=15)
+        r.raise_for_status()
+        return self._check(_loads(r.content))
 
     def cancel_order(self, body: Dict[str, Any]) -> Dict[str, Any]:
-        payload = json.dumps(body, separators=(",", ":"))
-        r = requests.post(f"{self.base}/v5/order/cancel", headers=self._headers(payload), data=payload, timeout=15)
+        payload = _dumps(body)
+        r = self._request("POST", self._trade_bucket, f"{self.base}/v5/order/cancel", headers=self._headers(payload), data=payload, timeout=15)
         r.raise_for_status()
-        return self._check(r.json())
+        return self._check(_loads(r.content))
+
+    def cancel_batch_orders(self, category: str, symbol: str, order_ids: List[str],
+                            id_field: str = "orderId") -> Dict[str, Any]:
+        """Cancel up to 20 orders in one request, by orderId or (id_field="orderLinkId") link.
+
+        Like place_batch_order, per-order failures are in retExtInfo.list.
+        """
+        body = {"category": category, "request": [{"symbol": symbol, id_field: oid} for oid in order_ids]}
+        payload = _dumps(body)
+        r = self._request("POST", self._trade_bucket, f"{self.base}/v5/order/cancel-batch", headers=self._headers(payload), data=payload, timeout=15)
+        r.raise_for_status()
+        return self._check(_loads(r.content))
 
     def open_orders(self, category: str, symbol: str) -> List[Dict[str, Any]]:
         params = {"category": category, "symbol": symbol}
         query_string = self._build_query_string(params)
-        r = requests.get(
+        r = self._request("GET", self._read_bucket,
             f"{self.base}/v5/order/realtime?{query_string}",
             headers=self._headers(query_string),
             timeout=15,
         )
         r.raise_for_status()
-        data = self._check(r.json())
+        data = self._check(_loads(r.content))
         return ((data.get("result") or {}).get("list") or [])
 
     def order_history(self, category: str, symbol: str, order_link_id: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
@@ -188,69 +321,89 @@ class BybitV5:
         if order_link_id:
             params["orderLinkId"] = order_link_id
         query_string = self._build_query_string(params)
-        r = requests.get(
+        r = self._request("GET", self._read_bucket,
             f"{self.base}/v5/order/history?{query_string}",
             headers=self._headers(query_string),
             timeout=15,
         )
         r.raise_for_status()
-        data = self._check(r.json())
+        data = self._check(_loads(r.content))
         return ((data.get("result") or {}).get("list") or [])
 
     # ---------- Positions ----------
-    def positions(self, category: str, symbol: str = "") -> List[Dict[str, Any]]:
+    def positions(self, category: str, symbol: str = "") -> List[Position]:
+        """Positions for symbol, or every USDT-settled position (all pages) if no symbol."""
         params = {"category": category}
         if symbol:  # Only add symbol if specified
             params["symbol"] = symbol
+        else:
+            params["limit"] = 200
         params["settleCoin"] = "USDT"  # Required for fetching all positions
-        query_string = self._build_query_string(params)
-        r = requests.get(
-            f"{self.base}/v5/position/list?{query_string}",
-            headers=self._headers(query_string),
-            timeout=15,
-        )
-        r.raise_for_status()
-        data = self._check(r.json())
-        return ((data.get("result") or {}).get("list") or [])
+        out: List[Position] = []
+        while True:
+            query_string = self._build_query_string(params)
+            r = self._request("GET", self._read_bucket,
+                f"{self.base}/v5/position/list?{query_string}",
+                headers=self._headers(query_string),
+                timeout=15,
+            )
+            r.raise_for_status()
+            result = self._check(_loads(r.content)).get("result") or {}
+            out.extend(Position.from_api(p) for p in result.get("list") or [])
+            cursor = result.get("nextPageCursor")
+            if symbol or not cursor:
+                return out
+            params["cursor"] = cursor
 
     def set_trading_stop(self, body: Dict[str, Any]) -> Dict[str, Any]:
-        payload = json.dumps(body, separators=(",", ":"))
-        r = requests.post(f"{self.base}/v5/position/trading-stop", headers=self._headers(payload), data=payload, timeout=15)
+        payload = _dumps(body)
+        r = self._request("POST", self._trade_bucket, f"{self.base}/v5/position/trading-stop", headers=self._headers(payload), data=payload, timeout=15)
         r.raise_for_status()
-        data = r.json()
+        data = _loads(r.content)
         # 34040 = "not modified" - SL/TP already set to same value, ignore this
         if data.get("retCode") == 34040:
             return data
         return self._check(data)
 
-    def closed_pnl(self, category: str, symbol: str, start_time: Optional[int] = None, limit: int = 50) -> List[Dict[str, Any]]:
-        """Get closed PnL records for a symbol."""
+    def closed_pnl(self, category: str, symbol: str, start_time: Optional[int] = None,
+                   limit: int = 50, end_time: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get closed PnL records for a symbol (every page in the time window)."""
         params = {"category": category, "symbol": symbol, "limit": limit}
         if start_time:
             params["startTime"] = start_time
-        query_string = self._build_query_string(params)
-        r = requests.get(
-            f"{self.base}/v5/position/closed-pnl?{query_string}",
-            headers=self._headers(query_string),
-            timeout=15,
-        )
-        r.raise_for_status()
-        data = self._check(r.json())
-        return ((data.get("result") or {}).get("list") or [])
+        if end_time:
+            params["endTime"] = end_time
+        out: List[Dict[str, Any]] = []
+        while True:
+            query_string = self._build_query_string(params)
+            r = self._request("GET", self._read_bucket,
+                f"{self.base}/v5/position/closed-pnl?{query_string}",
+                headers=self._headers(query_string),
+                timeout=15,
+            )
+            r.raise_for_status()
+            result = self._check(_loads(r.content)).get("result") or {}
+            out.extend(result.get("list") or [])
+            cursor = result.get("nextPageCursor")
+            if not cursor:
+                return out
+            params["cursor"] = cursor
 
     # ---------- WebSocket (private executions & orders) ----------
-    def run_private_ws(self, on_execution, on_order=None, on_error=None):
+    def run_private_ws(self, on_execution, on_order=None, on_error=None, on_open=None):
         expires = int(time.time() * 1000) + 10_000
         sign_payload = f"GET/realtime{expires}"
         sig = hmac.new(self.api_secret, sign_payload.encode(), hashlib.sha256).hexdigest()
 
         def _on_open(ws):
-            ws.send(json.dumps({"op": "auth", "args": [self.api_key, expires, sig]}))
-            ws.send(json.dumps({"op": "subscribe", "args": ["execution", "order"]}))
+            ws.send(_dumps({"op": "auth", "args": [self.api_key, expires, sig]}))
+            ws.send(_dumps({"op": "subscribe", "args": ["execution", "order"]}))
+            if on_open:
+                on_open()
 
         def _on_message(ws, message):
             try:
-                msg = json.loads(message)
+                msg = _loads(message)
             except Exception:
                 return
             if msg.get("op") == "auth" and msg.get("success") is False and on_error:
@@ -271,3 +424,52 @@ class BybitV5:
 
         ws = WebSocketApp(self.ws, on_open=_on_open, on_message=_on_message, on_error=_on_err)
         ws.run_forever(ping_interval=20, ping_timeout=10)
+
+    # ---------- WebSocket (public tickers) ----------
+    def run_public_ws(self, category: str, on_ticker, symbols, on_error=None, on_open=None):
+        """Stream tickers.{symbol} until the socket closes.
+
+        symbols() is called on every (re)connect for the set to subscribe;
+        subscribe_tickers/unsubscribe_tickers adjust it while connected.
+        """
+        def _on_open(ws):
+            self._public_ws = ws
+            self.subscribe_tickers(symbols())
+            if on_open:
+                on_open()
+
+        def _on_message(ws, message):
+            try:
+                msg = _loads(message)
+            except Exception:
+                return
+            data = msg.get("data")
+            if data and msg.get("topic", "").startswith("tickers."):
+                on_ticker(data)
+
+        def _on_err(ws, err):
+            if on_error:
+                on_error(err)
+
+        ws = WebSocketApp(f"{self.ws_public}/{category}", on_open=_on_open, on_message=_on_message, on_error=_on_err)
+        try:
+            ws.run_forever(ping_interval=20, ping_timeout=10)
+        finally:
+            self._public_ws = None
+
+    def _send_ticker_op(self, op: str, symbols) -> None:
+        ws = self._public_ws
+        if ws is None:
+            return  # not connected - run_public_ws subscribes on (re)connect
+        args = [f"tickers.{s}" for s in symbols]
+        try:
+            for i in range(0, len(args), 10):  # max 10 args per request
+                ws.send(_dumps({"op": op, "args": args[i:i + 10]}))
+        except Exception:
+            pass
+
+    def subscribe_tickers(self, symbols) -> None:
+        self._send_ticker_op("subscribe", symbols)
+
+    def unsubscribe_tickers(self, symbols) -> None:
+        self._send_ticker_op("unsubscribe", symbols)
@@ -13,8 +13,12 @@ Features:
 
 import sys
 import time
+import asyncio
+import bisect
 import threading
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from config import (
     TELEGRAM_API_ID, TELEGRAM_API_HASH, TELEGRAM_CHANNEL,
@@ -28,8 +32,8 @@ from config import (
 )
 from bybit_v5 import BybitV5
 from telegram_reader import TelegramReader
-from signal_parser import parse_signal, signal_hash
-from state import load_state, save_state, utc_day_key
+from signal_parser import parse_signal, signal_hash, looks_like_signal
+from state import load_state, save_state, utc_day_key, current_day_key
 from trade_engine import TradeEngine
 
 
@@ -45,60 +49,219 @@ def setup_logger() -> logging.Logger:
 
 # Global state (shared between threads)
 state = {}
-state_lock = threading.Lock()
 log = None
 engine = None
 bybit = None
 
+# One lock per concern so the signal path never queues behind maintenance or
+# disk writes. None of these is held across a network call or file write.
+trades_lock = threading.Lock()        # state["open_trades"] / ["trade_history"]
+counters_lock = threading.Lock()      # state["daily_counts"]
+seen_hashes_lock = threading.Lock()   # state["seen_signal_hashes"]
+save_lock = threading.Lock()          # serializes writes to STATE_FILE
+
+# Writes are coalesced: callers only flag state dirty, the saver thread
+# writes at most once per SAVE_DEBOUNCE_SEC
+SAVE_DEBOUNCE_SEC = 1.0
+_save_dirty = threading.Event()
+
+# placed_ts of recent entries, oldest first (batch-limit sliding window)
+_placed_ts_window: deque = deque()
+_window_lock = threading.Lock()
+
+# Dedupe: O(1) membership via the set, insertion order (for eviction) via the deque
+SEEN_HASHES_MAX = 500
+_seen_hashes_set: set = set()
+_seen_hashes_order: deque = deque(maxlen=SEEN_HASHES_MAX)
+
+DAILY_COUNTS_KEEP_DAYS = 7
+
+# Entry placement (Bybit round-trips) runs off the Telegram handler: the
+# handler enqueues, ENTRY_WORKERS consumer tasks place orders in threads.
+# Entries still in flight count against the limits so a burst can't overshoot them.
+ENTRY_WORKERS = 4
+_order_executor = ThreadPoolExecutor(max_workers=ENTRY_WORKERS, thread_name_prefix="entry")
+signal_queue: asyncio.Queue = None  # created in main() on the running loop
+_entries_in_flight = 0  # guarded by counters_lock
+
+
+def _trades_today() -> int:
+    # caller holds counters_lock
+    return int(state.get("daily_counts", {}).get(current_day_key(), 0))
+
 
 def trades_today() -> int:
-    with state_lock:
-        return int(state.get("daily_counts", {}).get(utc_day_key(), 0))
+    with counters_lock:
+        return _trades_today()
 
 
 def inc_trades_today():
-    with state_lock:
-        k = utc_day_key()
-        state.setdefault("daily_counts", {})[k] = int(state.get("daily_counts", {}).get(k, 0)) + 1
+    with counters_lock:
+        counts = state.setdefault("daily_counts", {})
+        k = current_day_key()
+        if k not in counts:
+            # New day: drop stale keys so the dict stays tiny
+            cutoff = utc_day_key(time.time() - DAILY_COUNTS_KEEP_DAYS * 86400)
+            for old in [d for d in counts if d < cutoff]:
+                del counts[old]
+        counts[k] = int(counts.get(k, 0)) + 1
+
+
+def _add_in_flight(n: int) -> None:
+    global _entries_in_flight
+    with counters_lock:
+        _entries_in_flight += n
+
+
+def _active_trades_count() -> int:
+    # caller holds trades_lock
+    return engine.status_count("pending", "open")
 
 
 def active_trades_count() -> int:
-    with state_lock:
-        return len([
-            tr for tr in state.get("open_trades", {}).values()
-            if tr.get("status") in ("pending", "open")
-        ])
+    with trades_lock:
+        return _active_trades_count()
+
+
+def _remember_hash(sh: tuple) -> None:
+    """Add a hash, evicting the oldest once SEEN_HASHES_MAX is reached (caller holds seen_hashes_lock)."""
+    if len(_seen_hashes_order) == _seen_hashes_order.maxlen:
+        _seen_hashes_set.discard(_seen_hashes_order[0])
+    _seen_hashes_order.append(sh)
+    _seen_hashes_set.add(sh)
+
+
+def _forget_hash(sh: tuple) -> None:
+    """Drop a hash remembered for a signal that was never acted on."""
+    with seen_hashes_lock:
+        if sh in _seen_hashes_set:
+            _seen_hashes_set.discard(sh)
+            _seen_hashes_order.remove(sh)
+
+
+def _prune_window(now: float) -> None:
+    cutoff = now - (SIGNAL_WINDOW_MIN * 60)
+    while _placed_ts_window and _placed_ts_window[0] < cutoff:
+        _placed_ts_window.popleft()
 
 
 def signals_in_window() -> int:
     """Count how many trades were placed in the last SIGNAL_WINDOW_MIN minutes."""
-    with state_lock:
-        cutoff = time.time() - (SIGNAL_WINDOW_MIN * 60)
-        count = 0
-        for tr in state.get("open_trades", {}).values():
-            placed_ts = tr.get("placed_ts", 0)
-            if placed_ts >= cutoff:
-                count += 1
-        return count
-
-
-def on_telegram_message(msg_id: int, text: str, timestamp: float) -> None:
-    """Handle incoming Telegram message - called by TelegramReader."""
+    with _window_lock:
+        _prune_window(time.time())
+        return len(_placed_ts_window)
+
+
+def _reserve_signal_slot(sh: tuple, symbol: str, now: float) -> bool:
+    """Check all limits + dedupe and reserve an entry slot in one critical section.
+
+    On success the hash is remembered and an in-flight entry is counted, so
+    no other signal can slip in between the checks and the reservation.
+    Lock order (trades -> counters -> window -> seen) is the only place
+    more than one of these is held.
+    """
+    global _entries_in_flight
+    with trades_lock, counters_lock, _window_lock, seen_hashes_lock:
+        # Entries still being placed count as taken
+        in_flight = _entries_in_flight
+
+        if _active_trades_count() + in_flight >= MAX_CONCURRENT_TRADES:
+            log.info(f"Max concurrent trades reached ({MAX_CONCURRENT_TRADES}) - skipping")
+            return False
+
+        if _trades_today() + in_flight >= MAX_TRADES_PER_DAY:
+            log.info(f"Max daily trades reached ({MAX_TRADES_PER_DAY}) - skipping")
+            return False
+
+        # Check batch limit (max X signals per time window)
+        _prune_window(now)
+        window_count = len(_placed_ts_window) + in_flight
+        if window_count >= SIGNALS_PER_WINDOW:
+            log.info(f"Batch limit reached ({window_count}/{SIGNALS_PER_WINDOW} in {SIGNAL_WINDOW_MIN}min) - skipping")
+            return False
+
+        # Check if already seen
+        if sh in _seen_hashes_set:
+            log.debug(f"Signal {symbol} already seen, skipping")
+            return False
+
+        _remember_hash(sh)
+        _entries_in_flight += 1
+        return True
+
+
+def record_signal_placed(placed_ts: float) -> None:
+    with _window_lock:
+        # Entry workers can finish out of order; keep the deque sorted so
+        # _prune_window can keep popping from the left
+        if _placed_ts_window and placed_ts < _placed_ts_window[-1]:
+            _placed_ts_window.insert(bisect.bisect(_placed_ts_window, placed_ts), placed_ts)
+        else:
+            _placed_ts_window.append(placed_ts)
+
+
+def _snapshot_state() -> dict:
+    """Copy state under the per-concern locks so it can be serialized lock-free."""
+    with trades_lock:
+        snap = dict(state)
+        snap["open_trades"] = {tid: dict(tr) for tid, tr in state.get("open_trades", {}).items()}
+        if "trade_history" in state:
+            snap["trade_history"] = list(state["trade_history"])
+        snap["stats_by_day"] = {day: dict(b) for day, b in state.get("stats_by_day", {}).items()}
+    with counters_lock:
+        snap["daily_counts"] = dict(state.get("daily_counts", {}))
+    with seen_hashes_lock:
+        snap["seen_signal_hashes"] = list(_seen_hashes_order)
+    snap["instrument_rules"] = dict(state.get("instrument_rules", {}))
+    return snap
+
+
+def mark_state_dirty() -> None:
+    """Schedule a state write (picked up by saver_loop)."""
+    _save_dirty.set()
+
+
+def flush_state() -> None:
+    """Write state now (save_state writes a .tmp file and os.replace()s it)."""
+    with save_lock:
+        save_state(STATE_FILE, _snapshot_state())
+
+
+def saver_loop():
+    """Background thread: coalesce dirty marks into one write per debounce window."""
+    while True:
+        _save_dirty.wait()
+        time.sleep(SAVE_DEBOUNCE_SEC)
+        _save_dirty.clear()
+        try:
+            flush_state()
+        except Exception as e:
+            log.warning(f"State save failed: {e}")
+
+
+async def on_telegram_message(msg_id: int, text: str, timestamp: float) -> None:
+    """Handle incoming Telegram message - awaited by TelegramReader on the event loop.
+
+    Everything here is CPU-only; Bybit calls are handed to _order_executor.
+    """
     global state, engine, log
 
+    now = time.time()  # one clock read per message, reused below
+
     # Skip old messages
-    age = time.time() - timestamp
+    age = now - timestamp
     if age > TC_MAX_LAG_SEC:
         log.debug(f"Skipping old message (age={age:.0f}s)")
         return
 
+    # Cheap prescan rejects chat/off-topic posts without touching a regex
+    if not looks_like_signal(text):
+        return
+
     # Parse signal
     sig = parse_signal(text, quote=QUOTE)
     if not sig:
-        # Check if it looks like a signal but failed to parse
-        if "Long" in text or "Short" in text:
-            if "Entry" in text or "Name:" in text:
-                log.debug(f"Possible signal NOT parsed: {text[:200]}...")
+        log.debug(f"Possible signal NOT parsed: {text[:200]}...")
         return
 
     log.info(f"Signal received: {sig['symbol']} {sig['side'].upper()} @ {sig['trigger']}")
@@ -109,43 +272,47 @@ def on_telegram_message(msg_id: int, text: str, timestamp: float) -> None:
         log.info(f"Symbol {sig['symbol']} is excluded - skipping")
         return
 
-    # Check limits
-    if active_trades_count() >= MAX_CONCURRENT_TRADES:
-        log.info(f"Max concurrent trades reached ({MAX_CONCURRENT_TRADES}) - skipping")
+    # Check limits + dedupe, reserving a slot atomically
+    sh = signal_hash(sig)
+    if not _reserve_signal_slot(sh, sig["symbol"], now):
         return
 
-    if trades_today() >= MAX_TRADES_PER_DAY:
-        log.info(f"Max daily trades reached ({MAX_TRADES_PER_DAY}) - skipping")
-        return
+    # Instrument rules load in the background while the entry waits its turn
+    engine.prefetch_instrument_rules(sig["symbol"])
 
-    # Check batch limit (max X signals per time window)
-    window_count = signals_in_window()
-    if window_count >= SIGNALS_PER_WINDOW:
-        log.info(f"Batch limit reached ({window_count}/{SIGNALS_PER_WINDOW} in {SIGNAL_WINDOW_MIN}min) - skipping")
-        return
+    # Hand off to the order consumers; the handler never waits on a full
+    # queue (that would stall every later Telegram update)
+    trade_id = f"{sig['symbol']}|{sig['side']}|{int(now)}"
+    try:
+        signal_queue.put_nowait((sig, trade_id, now))
+    except asyncio.QueueFull:
+        _add_in_flight(-1)
+        _forget_hash(sh)  # so a repost of this signal is not rejected as a duplicate
+        log.warning(f"Signal queue full - dropping {sig['symbol']} ({trade_id})")
 
-    # Check if already seen
-    sh = signal_hash(sig)
-    with state_lock:
-        seen = set(state.get("seen_signal_hashes", []))
-        if sh in seen:
-            log.debug(f"Signal {sig['symbol']} already seen, skipping")
-            return
-        seen.add(sh)
-        state["seen_signal_hashes"] = list(seen)[-500:]
 
-    # Place entry order
-    trade_id = f"{sig['symbol']}|{sig['side']}|{int(time.time())}"
-    log.info(f"Placing entry order for {sig['symbol']}...")
+async def order_consumer():
+    """Drain signal_queue, placing one entry at a time in _order_executor."""
+    loop = asyncio.get_running_loop()
+    while True:
+        sig, trade_id, placed_ts = await signal_queue.get()
+        try:
+            await loop.run_in_executor(_order_executor, _place_and_record, sig, trade_id, placed_ts)
+        finally:
+            signal_queue.task_done()
 
-    oid = engine.place_entry_order(sig, trade_id)
-    if not oid:
-        log.warning(f"Entry order failed for {sig['symbol']}")
-        return
 
-    # Store trade
-    with state_lock:
-        state.setdefault("open_trades", {})[trade_id] = {
+def _place_and_record(sig: dict, trade_id: str, placed_ts: float) -> None:
+    """Place the entry on Bybit and store the trade (runs in _order_executor)."""
+    try:
+        log.info(f"Placing entry order for {sig['symbol']}...")
+
+        oid, base_qty = engine.place_entry_order(sig, trade_id)
+        if not oid:
+            log.warning(f"Entry order failed for {sig['symbol']}")
+            return
+
+        engine.add_trade({
             "id": trade_id,
             "symbol": sig["symbol"],
             "order_side": "Sell" if sig["side"] == "sell" else "Buy",
@@ -155,23 +322,69 @@ def on_telegram_message(msg_id: int, text: str, timestamp: float) -> None:
             "sl_price": None,
             "entry_order_id": oid,
             "status": "pending",
-            "placed_ts": time.time(),
-            "base_qty": engine.calc_base_qty(sig["symbol"], float(sig["trigger"])),
+            "placed_ts": placed_ts,
+            "base_qty": base_qty,
             "raw": sig.get("raw", ""),
-        }
-
-    inc_trades_today()
-    log.info(f"ENTRY PLACED {sig['symbol']} {sig['side'].upper()} @ {sig['trigger']} (id={trade_id})")
-
-    # Save state
-    with state_lock:
-        save_state(STATE_FILE, state)
-
-
-def maintenance_loop():
-    """Background thread for maintenance tasks."""
-    global state, engine, log
-
+        })
+
+        record_signal_placed(placed_ts)
+        inc_trades_today()
+        log.info(f"ENTRY PLACED {sig['symbol']} {sig['side'].upper()} @ {sig['trigger']} (id={trade_id})")
+
+        mark_state_dirty()
+    except Exception as e:
+        log.exception(f"Entry placement error for {sig['symbol']}: {e}")
+    finally:
+        _add_in_flight(-1)
+
+
+def maintenance_tick() -> None:
+    """One maintenance pass. Blocking engine/HTTP work - run off the event loop."""
+    # Maintenance tasks (engine takes its own per-trade locks)
+    engine.cancel_expired_entries()
+    engine.cleanup_closed_trades()
+    engine.check_tp_fills_fallback()
+    engine.check_position_alerts()
+    engine.log_daily_stats()
+
+    # Phase 1 (locked): pick out trades needing the entry-fill poll / post-orders
+    with trades_lock:
+        pending = engine.trades_with_status("pending")
+        awaiting_post = [
+            (tid, tr) for tid, tr in engine.trades_with_status("open")
+            if not tr.get("post_orders_placed")
+        ]
+
+    # Phase 2 (unlocked): entry fill fallback - position lookups over HTTP
+    fills = []
+    for tid, tr in pending:
+        sz, avg = engine.position_size_avg(tr["symbol"])
+        if sz > 0 and avg > 0:
+            fills.append((tid, tr, avg))
+
+    # Phase 3 (per-trade lock, brief): apply transitions
+    for tid, tr, avg in fills:
+        with engine.trade_lock(tid):
+            if tr.get("status") != "pending":
+                continue  # WS execution got there first
+            engine.set_status(tr, "open")
+            tr["entry_price"] = avg
+            tr["filled_ts"] = time.time()
+            log.info(f"ENTRY (poll) {tr['symbol']} @ {avg}")
+        awaiting_post.append((tid, tr))
+
+    # Post-orders hold only this trade's lock, so a concurrent WS fill for
+    # the same trade can't place the SL/TPs twice
+    for tid, tr in awaiting_post:
+        with engine.trade_lock(tid):
+            if tr.get("status") == "open" and not tr.get("post_orders_placed"):
+                engine.place_post_entry_orders(tr)
+
+    mark_state_dirty()
+
+
+async def maintenance_loop():
+    """Background task for maintenance; each tick runs in a worker thread."""
     last_heartbeat = time.time()
     HEARTBEAT_INTERVAL = 300
 
@@ -183,64 +396,93 @@ def maintenance_loop():
                 log.info(f"Heartbeat: {active} active trade(s), {trades_today()} today")
                 last_heartbeat = time.time()
 
-            # Maintenance tasks
-            with state_lock:
-                engine.cancel_expired_entries()
-                engine.cleanup_closed_trades()
-                engine.check_tp_fills_fallback()
-                engine.check_position_alerts()
-                engine.log_daily_stats()
-
-                # Entry fill fallback and post-orders
-                for tid, tr in list(state.get("open_trades", {}).items()):
-                    if tr.get("status") == "pending":
-                        sz, avg = engine.position_size_avg(tr["symbol"])
-                        if sz > 0 and avg > 0:
-                            tr["status"] = "open"
-                            tr["entry_price"] = avg
-                            tr["filled_ts"] = time.time()
-                            log.info(f"ENTRY (poll) {tr['symbol']} @ {avg}")
-
-                    if tr.get("status") == "open" and not tr.get("post_orders_placed"):
-                        engine.place_post_entry_orders(tr)
-
-                save_state(STATE_FILE, state)
+            await asyncio.to_thread(maintenance_tick)
 
         except Exception as e:
             log.exception(f"Maintenance error: {e}")
 
-        time.sleep(10)
+        await asyncio.sleep(10)
+
+
+# Set when a WS opens, cleared on any WS error. A socket that then stays up
+# for WS_STABLE_SEC before closing cleanly counts as healthy: the backoff
+# resets and the loop reconnects after only WS_MIN_RECONNECT_SEC.
+_ws_reconnect_event = threading.Event()
+_ticker_reconnect_event = threading.Event()
+WS_STABLE_SEC = 30.0
+WS_MIN_RECONNECT_SEC = 0.5
+
+
+def _ws_reconnect_loop(name: str, connect, reconnect_event: threading.Event) -> None:
+    """Run connect(on_error, on_open) forever; it blocks until the socket closes.
+
+    Every reconnect waits at least WS_MIN_RECONNECT_SEC. Failures, and
+    connections that close within WS_STABLE_SEC of opening, back off
+    exponentially (0.5s doubling, capped at 30s).
+    """
+    backoff = WS_MIN_RECONNECT_SEC
+    opened_at = 0.0
+
+    def on_ws_error(err):
+        log.debug(f"{name} reconnecting: {err}")
+        reconnect_event.clear()
+
+    def on_ws_open():
+        nonlocal opened_at
+        opened_at = time.monotonic()
+        reconnect_event.set()
+
+    while True:
+        reconnect_event.clear()
+        try:
+            connect(on_ws_error, on_ws_open)
+        except Exception as e:
+            on_ws_error(e)
+        if reconnect_event.is_set() and time.monotonic() - opened_at >= WS_STABLE_SEC:
+            backoff = WS_MIN_RECONNECT_SEC
+            time.sleep(WS_MIN_RECONNECT_SEC)
+        else:
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
 
 
 def ws_loop():
-    """Background thread for Bybit WebSocket."""
+    """Background thread for Bybit WebSocket (websocket-client is blocking)."""
     global engine, log
 
     def on_execution(ev):
         try:
-            with state_lock:
-                engine.on_execution(ev)
-                save_state(STATE_FILE, state)
+            engine.on_execution(ev)
+            mark_state_dirty()
         except Exception as e:
             log.warning(f"WS execution handler error: {e}")
 
-    def on_ws_error(err):
-        log.debug(f"WS reconnecting: {err}")
-
-    while True:
+    def on_order(ev):
         try:
-            bybit.run_private_ws(
-                on_execution=on_execution,
-                on_order=lambda x: None,
-                on_error=on_ws_error,
-            )
+            if engine.on_order(ev):
+                mark_state_dirty()
         except Exception as e:
-            on_ws_error(e)
-        time.sleep(3)
+            log.warning(f"WS order handler error: {e}")
 
+    _ws_reconnect_loop("WS", lambda on_error, on_open: bybit.run_private_ws(
+        on_execution=on_execution,
+        on_order=on_order,
+        on_error=on_error,
+        on_open=on_open,
+    ), _ws_reconnect_event)
 
-def main():
-    global state, log, engine, bybit
+
+def ticker_ws_loop():
+    """Background thread streaming tickers for symbols with active trades."""
+    _ws_reconnect_loop("Ticker WS", lambda on_error, on_open: bybit.run_public_ws(
+        CATEGORY, engine.on_ticker, engine.ticker_symbols,
+        on_error=on_error,
+        on_open=on_open,
+    ), _ticker_reconnect_event)
+
+
+async def main():
+    global state, log, engine, bybit, signal_queue
 
     log = setup_logger()
 
@@ -259,6 +501,12 @@ def main():
 
     # Load state
     state = load_state(STATE_FILE)
+    for ts in sorted(tr.get("placed_ts") or 0 for tr in state.get("open_trades", {}).values()):
+        record_signal_placed(ts)
+    with seen_hashes_lock:
+        for sh in state.get("seen_signal_hashes", [])[-SEEN_HASHES_MAX:]:
+            if isinstance(sh, list):  # JSON turns the tuple key into a list
+                _remember_hash(tuple(sh))
 
     # Initialize Bybit
     bybit = BybitV5(
@@ -270,7 +518,7 @@ def main():
     )
 
     # Initialize trade engine
-    engine = TradeEngine(bybit, state, log)
+    engine = TradeEngine(bybit, state, log, trades_lock=trades_lock)
 
     # Initialize Telegram reader
     telegram = TelegramReader(
@@ -300,26 +548,42 @@ def main():
     # Startup sync
     engine.startup_sync()
 
-    # Start background threads
+    # Bybit WS stays on a daemon thread: the client blocks forever and a
+    # daemon thread (unlike an executor worker) doesn't hold up shutdown
     ws_thread = threading.Thread(target=ws_loop, daemon=True)
     ws_thread.start()
+    ticker_thread = threading.Thread(target=ticker_ws_loop, daemon=True)
+    ticker_thread.start()
+
+    saver_thread = threading.Thread(target=saver_loop, daemon=True)
+    saver_thread.start()
 
-    maint_thread = threading.Thread(target=maintenance_loop, daemon=True)
-    maint_thread.start()
+    signal_queue = asyncio.Queue(maxsize=100)
+    consumer_tasks = [asyncio.create_task(order_consumer()) for _ in range(ENTRY_WORKERS)]
+
+    maint_task = asyncio.create_task(maintenance_loop())
 
     # Set message handler and start Telegram
     telegram.set_message_handler(on_telegram_message)
-    telegram.start()
+    await telegram.start()
 
     log.info("Bot is running. Waiting for signals...")
 
-    # Run until disconnected (this blocks)
     try:
-        telegram.run_forever()
-    except KeyboardInterrupt:
+        await telegram.run_forever()
+    finally:
         log.info("Bye")
-        telegram.disconnect()
+        maint_task.cancel()
+        for t in consumer_tasks:
+            t.cancel()
+        await telegram.disconnect()
+        _order_executor.shutdown(wait=True)
+        engine.shutdown()
+        flush_state()
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
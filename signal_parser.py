@@ -16,8 +16,7 @@ Parses signals with format:
 """
 
 import re
-import hashlib
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 
 NUM = r"([0-9]+(?:\.[0-9]+)?)"
 
@@ -27,14 +26,48 @@ RE_SIDE = re.compile(r"(Short|Long)", re.I)
 # Match "Name: SYMBOL/USDT" or "Name: SYMBOLUSDT"
 RE_SYMBOL = re.compile(r"Name:\s*([A-Z0-9]+)[/]?USDT", re.I)
 
-# Match entry price - can be on same line or next line
-RE_ENTRY = re.compile(r"Entry\s+price\s*\(?USDT\)?:?\s*\n?\s*" + NUM, re.I)
+# Entry header exactly as the provider writes it (fast path, no regex)
+ENTRY_HEADER = "Entry price(USDT):"
 
-# Match targets: "1) 0.5845" etc
-RE_TARGET = re.compile(r"(\d+)\)\s*" + NUM, re.I)
+# Match entry header variants - price follows on the same line or the next non-blank one
+RE_ENTRY = re.compile(r"Entry\s+price\s*\(?USDT\)?:?", re.I)
 
-# Detect "unlimited" target to skip
-RE_UNLIMITED = re.compile(r"unlimited", re.I)
+# Bare number at the start of a (stripped) line
+RE_NUM = re.compile(NUM)
+
+# Match targets: "1) 0.5845" etc; "5) unlimited" matches with no price
+RE_TARGET = re.compile(r"(\d+)\)\s*(?:" + NUM + r"|unlimited)", re.I)
+
+# Target marker ending its line: the price is on the next non-blank one
+RE_TARGET_OPEN = re.compile(r"(\d+)\)\s*$")
+
+# Cheap substring prescan over the casefolded text (the regexes are re.I)
+_NAME_MARKER = "name:"
+_SIDE_MARKERS = ("long", "short")
+
+
+def _parse_price(s: str) -> Optional[float]:
+    """Leading number of s: plain float() for a bare decimal, regex otherwise."""
+    if s[:1].isdigit() and s.replace(".", "", 1).isdigit():  # (float() alone takes "1e5", ".5")
+        return float(s)
+    num_match = RE_NUM.match(s)
+    return float(num_match.group(1)) if num_match else None
+
+
+def looks_like_signal(text: str) -> bool:
+    """Fast reject for chat/off-topic posts; run it before parse_signal()."""
+    folded = text.casefold()
+    if _NAME_MARKER not in folded:
+        return False
+    return any(m in folded for m in _SIDE_MARKERS)
+
+
+def _put_target(tps: List[float], idx: int, price: float) -> None:
+    """Store TP number idx (1-based), padding missing ones with 0.0."""
+    while len(tps) < idx:
+        tps.append(0.0)
+    if idx <= 4:  # Only take first 4 targets
+        tps[idx - 1] = price
 
 
 def parse_signal(text: str, quote: str = "USDT") -> Optional[Dict[str, Any]]:
@@ -50,55 +83,92 @@ def parse_signal(text: str, quote: str = "USDT") -> Optional[Dict[str, Any]]:
         - sl_price: None (provider doesn't give SL)
         - raw: Original text
 
-    Returns None if not a valid signal.
+    Returns None if not a valid signal. Callers screening a message stream
+    should run looks_like_signal() first; it is not repeated here.
     """
-    # Must have Short or Long
-    side_match = RE_SIDE.search(text)
-    if not side_match:
-        return None
+    side = None
+    base = None
+    trigger = None
+    awaiting_entry = False
+    awaiting_target = 0  # TP number whose price is on the next line
+    awaiting_unlimited = False  # its marker line said "unlimited"
+    tps: List[float] = []
 
-    side_word = side_match.group(1).upper()
-    side = "sell" if side_word == "SHORT" else "buy"
+    # Single pass over the lines; each line is scanned once per field at most
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
 
-    # Must have symbol
-    symbol_match = RE_SYMBOL.search(text)
-    if not symbol_match:
+        # Entry price on the line after its header (the rest of the line is
+        # still scanned for the other fields)
+        if awaiting_entry:
+            awaiting_entry = False
+            trigger = _parse_price(stripped)
+
+        # Target price on the line after its "N)" marker; target scanning on
+        # this line resumes after that number
+        scan = line
+        if awaiting_target:
+            num_match = RE_NUM.match(stripped)
+            if num_match:
+                if not awaiting_unlimited and "unlimited" not in stripped.casefold():
+                    _put_target(tps, awaiting_target, float(num_match.group(1)))
+                scan = stripped[num_match.end():]
+            awaiting_target = 0
+
+        # Must have Short or Long (first occurrence wins)
+        if side is None:
+            side_match = RE_SIDE.search(line)
+            if side_match:
+                side = "sell" if side_match.group(1).upper() == "SHORT" else "buy"
+
+        # Must have symbol
+        if base is None:
+            symbol_match = RE_SYMBOL.search(line)
+            if symbol_match:
+                base = symbol_match.group(1).upper()
+
+        # Must have entry price (the header's colon is optional). A header
+        # with no number after it is skipped in favour of a later one.
+        if trigger is None:
+            if stripped.startswith(ENTRY_HEADER):
+                rest = stripped[len(ENTRY_HEADER):].strip()
+                if not rest:
+                    awaiting_entry = True
+                else:
+                    trigger = _parse_price(rest)
+            if trigger is None and not awaiting_entry:
+                for entry_match in RE_ENTRY.finditer(line):  # other spellings
+                    rest = line[entry_match.end():].strip()
+                    if not rest:
+                        awaiting_entry = True
+                        break
+                    trigger = _parse_price(rest)
+                    if trigger is not None:
+                        break
+
+        # Extract targets (up to 4); nothing on an "unlimited" line counts
+        if ")" in scan:
+            unlimited = "unlimited" in line.casefold()
+            end = 0
+            for m in RE_TARGET.finditer(scan):
+                end = m.end()
+                price_str = m.group(2)
+                if price_str is not None and not unlimited:
+                    _put_target(tps, int(m.group(1)), float(price_str))
+
+            # (a number already taken as a target's price is no marker)
+            open_match = RE_TARGET_OPEN.search(scan, end)
+            if open_match:
+                awaiting_target = int(open_match.group(1))
+                awaiting_unlimited = unlimited
+
+    if side is None or base is None or trigger is None:
         return None
 
-    base = symbol_match.group(1).upper()
     symbol = f"{base}{quote}"
 
-    # Must have entry price
-    entry_match = RE_ENTRY.search(text)
-    if not entry_match:
-        return None
-
-    trigger = float(entry_match.group(1))
-
-    # Extract targets (up to 4, skip "unlimited")
-    tps: List[float] = []
-    for m in RE_TARGET.finditer(text):
-        idx = int(m.group(1))
-        price_str = m.group(2)
-
-        # Skip if this line contains "unlimited"
-        line_start = text.rfind('\n', 0, m.start()) + 1
-        line_end = text.find('\n', m.end())
-        if line_end == -1:
-            line_end = len(text)
-        line = text[line_start:line_end]
-
-        if RE_UNLIMITED.search(line):
-            continue
-
-        price = float(price_str)
-
-        # Ensure list is long enough
-        while len(tps) < idx:
-            tps.append(0.0)
-        if idx <= 4:  # Only take first 4 targets
-            tps[idx - 1] = price
-
     # Filter out zeros
     tps = [p for p in tps if p > 0]
 
@@ -125,10 +195,13 @@ def parse_signal(text: str, quote: str = "USDT") -> Optional[Dict[str, Any]]:
     }
 
 
-def signal_hash(sig: Dict[str, Any]) -> str:
-    """Generate unique hash for signal deduplication."""
-    core = f"{sig.get('symbol')}|{sig.get('side')}|{sig.get('trigger')}|{sig.get('tp_prices')}"
-    return hashlib.md5(core.encode("utf-8")).hexdigest()
+def signal_hash(sig: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Dedupe key for a signal: (symbol, side, trigger, *tp_prices).
+
+    Only ever compared in-process, so a flat tuple is enough - no digest
+    needed. Persisted as a JSON list and turned back into a tuple on load.
+    """
+    return (sig.get("symbol"), sig.get("side"), sig.get("trigger"), *(sig.get("tp_prices") or ()))
 
 
 # For testing
@@ -1,18 +1,41 @@
 import json
 import time
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import asdict, dataclass, is_dataclass
 from pathlib import Path
 from typing import Any, Dict
 
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json works the same
+    orjson = None
+
 def utc_day_key(ts: float | None = None) -> str:
     if ts is None:
         ts = time.time()
     return time.strftime("%Y-%m-%d", time.gmtime(ts))
 
+# (day_start, day_end, key) for the current UTC day
+_day_cache: tuple = (0.0, 0.0, "")
+
+def current_day_key() -> str:
+    """utc_day_key() for now, recomputed only when the UTC day rolls over."""
+    global _day_cache
+    now = time.time()
+    start, end, key = _day_cache
+    if start <= now < end:
+        return key
+    start = float(int(now) // 86400 * 86400)
+    key = utc_day_key(now)
+    _day_cache = (start, start + 86400, key)
+    return key
+
 def load_state(path: str) -> Dict[str, Any]:
     p = Path(path)
     if p.exists():
         try:
+            if orjson is not None:
+                return orjson.loads(p.read_bytes())
             return json.loads(p.read_text(encoding="utf-8"))
         except Exception:
             pass
@@ -23,8 +46,20 @@ def load_state(path: str) -> Dict[str, Any]:
         "seen_signal_hashes": [],     # dedupe
     }
 
+def _json_default(obj: Any) -> Any:
+    # Dataclass records (e.g. TradeRecord; orjson serializes these natively)
+    # and the bounded deque the engine keeps trade_history in
+    if is_dataclass(obj):
+        return asdict(obj)
+    if isinstance(obj, deque):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
 def save_state(path: str, st: Dict[str, Any]) -> None:
     p = Path(path)
     tmp = p.with_suffix(p.suffix + ".tmp")
-    tmp.write_text(json.dumps(st, ensure_ascii=False, separators=(",",":")), encoding="utf-8")
+    if orjson is not None:
+        tmp.write_bytes(orjson.dumps(st, default=_json_default))
+    else:
+        tmp.write_text(json.dumps(st, ensure_ascii=False, separators=(",",":"), default=_json_default), encoding="utf-8")
     tmp.replace(p)
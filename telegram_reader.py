@@ -13,10 +13,10 @@ Setup:
    - TELEGRAM_SESSION_STRING: Session string for persistent auth
 """
 
-from telethon import events
-from telethon.sync import TelegramClient
+from telethon import events, TelegramClient
 from telethon.sessions import StringSession
 from typing import Callable, Optional, List, Set
+import inspect
 import logging
 import time
 
@@ -35,8 +35,11 @@ class TelegramReader:
         self.api_hash = api_hash
         self.channels_raw = channels
         self.session = StringSession(session_string)
-        self.client: Optional[TelegramClient] = None
+        # Created once and reused across start()/disconnect() so the session's
+        # DC auth keys survive reconnects.
+        self.client = TelegramClient(self.session, api_id, api_hash)
         self._message_handler: Optional[Callable] = None
+        self._handler_added = False
         self._chat_ids: Set[int] = set()
 
         # Parse channel IDs (comma-separated)
@@ -50,57 +53,52 @@ class TelegramReader:
                 # Username - we'll accept all if any username is given
                 log.warning(f"Username '{ch}' given - will accept messages from all chats. Use numeric IDs for filtering.")
 
-    def _match_chat(self, event) -> bool:
-        """Check if message is from one of our target channels."""
-        if not self._chat_ids:
-            # No numeric IDs configured, accept all
-            return True
-        return event.chat_id in self._chat_ids
-
     def set_message_handler(self, handler: Callable) -> None:
         """Set the callback function for new messages.
 
         Handler receives: (message_id: int, text: str, timestamp: float)
+        and may be a plain function or a coroutine function (awaited on the
+        client's event loop, so it must not block).
         """
         self._message_handler = handler
 
-    def start(self) -> None:
-        """Start the Telegram client and listen for messages."""
-        self.client = TelegramClient(self.session, self.api_id, self.api_hash)
-
-        @self.client.on(events.NewMessage())
-        async def handler(event):
-            # Check if from one of our channels
-            if not self._match_chat(event):
-                return
+    async def _on_new_message(self, event) -> None:
+        text = event.raw_text or ""
+        if not text:
+            return
 
-            text = event.raw_text or ""
-            if not text:
-                return
+        msg_id = event.id
+        timestamp = event.date.timestamp() if event.date else time.time()
 
-            msg_id = event.id
-            timestamp = event.date.timestamp() if event.date else time.time()
+        log.debug(f"New message from {event.chat_id}: {text[:100]}...")
 
-            log.debug(f"New message from {event.chat_id}: {text[:100]}...")
-
-            if self._message_handler:
-                try:
-                    self._message_handler(msg_id, text, timestamp)
-                except Exception as e:
-                    log.error(f"Message handler error: {e}")
+        if self._message_handler:
+            try:
+                result = self._message_handler(msg_id, text, timestamp)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                log.error(f"Message handler error: {e}")
 
-        self.client.start()
+    async def start(self) -> None:
+        """Start the Telegram client and listen for messages."""
+        if not self._handler_added:
+            # Let Telethon drop other chats before our handler is even called.
+            # No numeric IDs configured (username only) -> accept all.
+            chats = list(self._chat_ids) or None
+            self.client.add_event_handler(self._on_new_message, events.NewMessage(chats=chats))
+            self._handler_added = True
+
+        await self.client.start()
         log.info(f"Telegram client started, listening to {len(self._chat_ids)} channel(s): {self._chat_ids}")
 
-    def run_forever(self) -> None:
-        """Block and run until disconnected."""
-        if self.client:
-            self.client.run_until_disconnected()
+    async def run_forever(self) -> None:
+        """Run until disconnected."""
+        await self.client.run_until_disconnected()
 
-    def disconnect(self) -> None:
+    async def disconnect(self) -> None:
         """Disconnect the client."""
-        if self.client:
-            self.client.disconnect()
+        await self.client.disconnect()
 
     def get_session_string(self) -> str:
         """Get the current session string for persistence."""
@@ -15,9 +15,28 @@ Usage (Railway):
 """
 
 import os
+import sys
 import json
 import time
-from websocket import WebSocketApp
+import threading
+from typing import Any, Dict, Optional, Set, Tuple
+from websocket import ABNF, WebSocketApp
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+if orjson is not None:
+    _loads = orjson.loads
+
+    def _pretty(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+else:
+    _loads = json.loads
+
+    def _pretty(obj: Any) -> str:
+        return json.dumps(obj, indent=2, ensure_ascii=False)
 
 # =============================================================================
 # CONFIGURATION - From ENV variables
@@ -25,13 +44,44 @@ from websocket import WebSocketApp
 JWT_TOKEN = os.getenv("FOXSIGNALS_JWT", "")
 USER_ID = os.getenv("FOXSIGNALS_USER_ID", "")
 
+# Socket.IO connect packet with auth, built once (json.dumps handles escaping)
+_AUTH_MSG = "40" + json.dumps({"jsonwebtoken": JWT_TOKEN, "userid": USER_ID}, separators=(",", ":"))
+_PONG = "3"
+
 WS_URL = "wss://serverapi.getfoxsignals.com/socketio/socket.io/?EIO=4&transport=websocket"
 
 # =============================================================================
 
-def parse_socketio_message(data: str):
+# Complete one-char frames (ping/pong heartbeats are the common case)
+_SINGLE_CHAR: Dict[str, Tuple[str, Any]] = {
+    "0": ("open", ""),
+    "2": ("ping", None),
+    "3": ("pong", None),
+}
+
+# Socket.IO prefix -> (type, payload offset, payload is JSON).
+# Two-char prefixes are checked first, then the single-char ones.
+_SIO_DISPATCH: Dict[str, Tuple[str, int, bool]] = {
+    "42": ("event", 2, True),
+    "43": ("ack", 2, False),
+    "40": ("connect", 2, False),
+    "41": ("disconnect", 2, False),
+}
+_SIO_SINGLE: Dict[str, Tuple[str, int, bool]] = {
+    "0": ("open", 1, True),
+}
+
+# Noisy events that are dropped without logging
+_IGNORED_SET = frozenset({
+    "prices_all", "price", "prices", "ticker", "tickers", "market_analysis", "symbols_tracker",
+})
+
+
+def parse_socketio_message(data: str) -> Tuple[Any, ...]:
     """Parse Socket.IO message format.
 
+    Returns (type, payload), or (type, name, data) for decoded events.
+
     Socket.IO v4 message types:
     0 - open
     1 - close
@@ -45,72 +95,117 @@ def parse_socketio_message(data: str):
     """
     if not data:
         return None, None
+    if len(data) == 1:
+        return _SINGLE_CHAR.get(data, ("unknown", data))
 
     # Get message type (first 1-2 chars)
-    if data.startswith("42"):
-        # Event message - parse JSON payload
-        try:
-            payload = json.loads(data[2:])
-            event_name = payload[0] if isinstance(payload, list) else None
-            event_data = payload[1] if isinstance(payload, list) and len(payload) > 1 else payload
-            return "event", {"name": event_name, "data": event_data}
-        except:
-            return "event", data[2:]
-    elif data.startswith("43"):
-        # Ack
-        return "ack", data[2:]
-    elif data.startswith("40"):
-        # Connect
-        return "connect", data[2:]
-    elif data.startswith("41"):
-        # Disconnect
-        return "disconnect", data[2:]
-    elif data == "2":
-        return "ping", None
-    elif data == "3":
-        return "pong", None
-    elif data.startswith("0"):
-        # Open - contains session info
-        try:
-            return "open", json.loads(data[1:])
-        except:
-            return "open", data[1:]
-    else:
+    entry = _SIO_DISPATCH.get(data[:2]) or _SIO_SINGLE.get(data[:1])
+    if entry is None:
         return "unknown", data
 
+    msg_type, offset, is_json = entry
+    body = data[offset:]
+    if not is_json:
+        return msg_type, body
+    try:
+        payload = _loads(body)
+    except ValueError:  # json.JSONDecodeError / orjson.JSONDecodeError
+        return msg_type, body
+
+    if msg_type == "event":
+        if not isinstance(payload, list):
+            return "event", None, payload
+        if not payload:
+            return "event", body
+        event_name = payload[0]
+        if isinstance(event_name, (dict, list)):
+            event_name = str(event_name)  # keep it hashable for the set lookups
+        return "event", event_name, payload[1] if len(payload) > 1 else payload
+    return msg_type, payload
+
+
+# (epoch second, "HH:MM:SS") of the last formatted timestamp
+_ts_cache: Tuple[int, str] = (0, "")
+
+
+def _now_hms() -> str:
+    """Local HH:MM:SS, re-formatted only when the second changes."""
+    global _ts_cache
+    t = int(time.time())
+    if t != _ts_cache[0]:
+        _ts_cache = (t, time.strftime("%H:%M:%S", time.localtime(t)))
+    return _ts_cache[1]
+
+
+# stdout is flushed at most once per _FLUSH_INTERVAL seconds; a write inside
+# the interval arms a one-shot timer so the tail of a burst still goes out
+_FLUSH_INTERVAL = 0.05
+_last_flush = 0.0
+_flush_timer: Optional[threading.Timer] = None
+_SEP = "=" * 60
+
+
+def _deferred_flush() -> None:
+    global _last_flush, _flush_timer
+    _flush_timer = None
+    _last_flush = time.monotonic()
+    sys.stdout.flush()
+
+
+def _emit(text: str) -> None:
+    """Write a whole output block with one call, flushing at most every 50 ms."""
+    global _last_flush, _flush_timer
+    sys.stdout.write(text)
+    now = time.monotonic()
+    if now - _last_flush >= _FLUSH_INTERVAL:
+        _last_flush = now
+        sys.stdout.flush()
+    elif _flush_timer is None:
+        _flush_timer = threading.Timer(_FLUSH_INTERVAL, _deferred_flush)
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
 
 class FoxSignalsTest:
-    def __init__(self):
-        self.ws = None
+    def __init__(self) -> None:
+        self.ws: Optional[WebSocketApp] = None
         self.connected = False
         self.message_count = 0
+        self._seen_events: Set[Any] = set()
 
-    def on_open(self, ws):
+    def on_open(self, ws: WebSocketApp) -> None:
         print("\n" + "="*60)
         print("✓ WebSocket CONNECTED")
         print("="*60)
         print("\nWaiting for messages... (Ctrl+C to stop)\n")
         self.connected = True
 
-    def on_message(self, ws, message):
+    def on_message(self, ws: WebSocketApp, message: str) -> None:
         self.message_count += 1
-        msg_type, payload = parse_socketio_message(message)
 
-        timestamp = time.strftime("%H:%M:%S")
+        # Ignored events are by far the most frequent - drop them by name
+        # ('42["name",...') before paying for the JSON parse.
+        if message.startswith('42["'):
+            end = message.find('"', 4)
+            if end > 0 and message[4:end] in _IGNORED_SET:
+                return
+
+        msg_type, *rest = parse_socketio_message(message)
 
         if msg_type == "ping":
             # Respond to ping with pong (silently)
-            ws.send("3")
+            ws.send(_PONG, opcode=ABNF.OPCODE_TEXT)
             return
 
         if msg_type == "pong":
             return
 
+        timestamp = _now_hms()
+
         if msg_type == "open":
-            print(f"[{timestamp}] ← OPEN: {json.dumps(payload, indent=2)}")
+            print(f"[{timestamp}] ← OPEN: {_pretty(rest[0])}")
             # Nach dem Open senden wir den Connect mit Auth
-            auth_msg = f'40{{"jsonwebtoken":"{JWT_TOKEN}","userid":"{USER_ID}"}}'
-            ws.send(auth_msg)
+            ws.send(_AUTH_MSG)
             print(f"[{timestamp}] → AUTH sent")
 
             # Try subscribing to signals channel
@@ -131,38 +226,36 @@ class FoxSignalsTest:
             return
 
         if msg_type == "event":
-            if isinstance(payload, dict):
-                event_name = payload.get('name', 'unknown')
+            if len(rest) == 2:
+                event_name, data = rest
 
-                # IGNORE these noisy events (only hide data, still log name)
-                ignored_events = ['prices_all', 'price', 'prices', 'ticker', 'tickers', 'market_analysis', 'symbols_tracker']
-                if event_name in ignored_events:
+                # Fallback for frames the fast path above didn't match
+                if event_name in _IGNORED_SET:
                     return  # Skip price updates completely
 
                 # Log ALL other events with full data
-                print(f"\n[{timestamp}] ← EVENT: {event_name}")
-                print("="*60)
-                data = payload.get('data', {})
-                print(json.dumps(data, indent=2, ensure_ascii=False))
-                print("="*60 + "\n")
-
-                # Also save to see all unique event names
-                print(f">>> NEW EVENT TYPE FOUND: {event_name} <<<")
+                out = f"\n[{timestamp}] ← EVENT: {event_name}\n{_SEP}\n{_pretty(data)}\n{_SEP}\n\n"
+
+                # Announce each event name the first time it shows up
+                if event_name not in self._seen_events:
+                    self._seen_events.add(event_name)
+                    out += f">>> NEW EVENT TYPE FOUND: {event_name} <<<\n"
+                _emit(out)
             else:
-                print(f"\n[{timestamp}] ← EVENT: {payload}")
+                print(f"\n[{timestamp}] ← EVENT: {rest[0]}")
             return
 
         # Unknown message type
         print(f"[{timestamp}] ← [{msg_type}] {message[:200]}")
 
-    def on_error(self, ws, error):
+    def on_error(self, ws: WebSocketApp, error: Exception) -> None:
         print(f"\n✗ ERROR: {error}")
 
-    def on_close(self, ws, close_status_code, close_msg):
+    def on_close(self, ws: WebSocketApp, close_status_code: Optional[int], close_msg: Optional[str]) -> None:
         print(f"\n✗ DISCONNECTED (code={close_status_code}, msg={close_msg})")
         self.connected = False
 
-    def run(self):
+    def run(self) -> None:
         print("\n" + "="*60)
         print("FoxSignals WebSocket Test")
         print("="*60)
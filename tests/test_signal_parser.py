@@ -0,0 +1,69 @@
+"""parse_signal regressions: expected values are what the original whole-text
+regex parser returned for the same messages."""
+
+import pytest
+
+from signal_parser import looks_like_signal, parse_signal
+
+EPIC = """
+Short
+Name: EPIC/USDT
+Margin mode: Cross (25.0X)
+
+Entry price(USDT):
+0.5904
+
+Targets(USDT):
+1) 0.5845
+2) 0.5786
+3) 0.5727
+4) 0.5668
+5) unlimited
+"""
+
+POL_HEAD = "Long\nName: POL/USDT\nMargin mode: Cross (75.0X)\n"
+
+
+def _key(sig):
+    return sig and (sig["symbol"], sig["side"], sig["trigger"], sig["tp_prices"])
+
+
+@pytest.mark.parametrize("text, expected", [
+    (EPIC, ("EPICUSDT", "sell", 0.5904, [0.5845, 0.5786, 0.5727, 0.5668])),
+    # entry header without a colon, price on the next line
+    ("Long\nName: POL/USDT\nEntry price USDT\n0.5904", ("POLUSDT", "buy", 0.5904, [])),
+    # symbol and entry on the same line
+    ("Long Name: POL/USDT Entry price(USDT): 0.1090", ("POLUSDT", "buy", 0.109, [])),
+    # target price on the line after its marker
+    (POL_HEAD + "Entry price(USDT):\n0.1090\nTargets(USDT):\n1)\n0.1101\n2) 0.1112",
+     ("POLUSDT", "buy", 0.109, [0.1101, 0.1112])),
+    (POL_HEAD + "Entry price(USDT):\n0.1090\n1)\n\n0.1101\n2)\n0.1112\n3) 0.1123\n4)\n0.1134\n5) unlimited",
+     ("POLUSDT", "buy", 0.109, [0.1101, 0.1112, 0.1123, 0.1134])),
+    # nothing on a line mentioning "unlimited" counts
+    ("Short\nName: EPIC/USDT\nEntry price(USDT): 0.5904\n1) 0.5845\n2) 0.5786 unlimited",
+     ("EPICUSDT", "sell", 0.5904, [0.5845])),
+    ("Short\nName: EPIC/USDT\nEntry price(USDT): 0.5904\n1) 0.5845 2) 0.5786 3) unlimited",
+     ("EPICUSDT", "sell", 0.5904, [])),
+    # a header with no number is skipped for a later one
+    ("Long\nName: POL/USDT\nEntry price(USDT): tbd Entry price(USDT): 0.1090", ("POLUSDT", "buy", 0.109, [])),
+    # case-insensitive throughout
+    ("short\nname: epic/usdt\nentry price(usdt):\n0.5904\n1) 0.5845\n2) 0.5786",
+     ("EPICUSDT", "sell", 0.5904, [0.5845, 0.5786])),
+    # no entry price / no side / no symbol
+    ("Long\nName: POL/USDT\nTargets:\n1) 0.1101", None),
+    ("Name: POL/USDT\nEntry price(USDT): 0.1090", None),
+    ("Long\nEntry price(USDT): 0.1090", None),
+])
+def test_parse_signal_matches_original_parser(text, expected):
+    assert _key(parse_signal(text)) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    (EPIC, True),
+    ("short\nname: epic/usdt", True),
+    ("SHORT\nNAME: EPIC/USDT", True),
+    ("gm everyone, long day", False),
+    ("Name: EPIC/USDT only", False),
+])
+def test_looks_like_signal(text, expected):
+    assert looks_like_signal(text) is expected
@@ -0,0 +1,25 @@
+from collections import deque
+from dataclasses import dataclass
+
+import pytest
+
+import state
+
+
+@dataclass(frozen=True)
+class _Rec:
+    id: str
+    pnl: float
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_save_state_serializes_deque_and_dataclasses(tmp_path, monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(state, "orjson", None)
+    elif state.orjson is None:
+        pytest.skip("orjson not installed")
+    path = str(tmp_path / "state.json")
+
+    state.save_state(path, {"trade_history": deque([_Rec("a", 1.5)], maxlen=3), "open_trades": {}})
+
+    assert state.load_state(path)["trade_history"] == [{"id": "a", "pnl": 1.5}]
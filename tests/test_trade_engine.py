@@ -0,0 +1,164 @@
+"""TradeEngine regressions: exit classification, step rounding and the TP split.
+
+Exit reasons are checked against the if/elif chain the decision table
+replaced; rounding is checked against exact Decimal arithmetic."""
+
+import itertools
+import logging
+from decimal import ROUND_FLOOR, ROUND_HALF_EVEN, Decimal
+
+import pytest
+
+import trade_engine
+from trade_engine import (
+    EXIT_ALL_TPS, EXIT_BREAKEVEN, EXIT_SL, EXIT_TP_THEN_SL, EXIT_TRAILING, EXIT_UNKNOWN,
+    TradeEngine,
+)
+
+
+class _FakeBybit:
+    def __init__(self):
+        self.batches = []
+
+    def set_trading_stop(self, body):
+        return {}
+
+    def place_batch_order(self, category, batch):
+        self.batches.append(batch)
+        return {"result": {"list": [{"orderId": f"o{i}"} for i in range(len(batch))]}}
+
+
+@pytest.fixture
+def engine():
+    eng = TradeEngine(_FakeBybit(), {"open_trades": {}}, logging.getLogger("test"))
+    yield eng
+    eng.shutdown()
+
+
+# ---------- exit classification ----------
+
+def _chained_exit_reason(trade):
+    """_determine_exit_reason as it was before _EXIT_TABLE."""
+    tp_fills = trade.get("tp_fills", 0)
+    pnl = trade.get("realized_pnl", 0)
+    won = pnl is not None and pnl > 0
+    lost = pnl is not None and pnl < 0
+    flat = pnl is not None and abs(pnl) < 1
+
+    if won and trade.get("trailing_started", False):
+        return "trailing_stop", EXIT_TRAILING
+    if tp_fills >= trade.get("tp_count", 0):
+        return "all_tps_hit", EXIT_ALL_TPS
+    if tp_fills > 0:
+        if flat and trade.get("sl_moved_to_be", False):
+            return "breakeven", EXIT_BREAKEVEN
+        return f"tp{tp_fills}_then_sl", EXIT_TP_THEN_SL
+    if lost:
+        return "stop_loss", EXIT_SL
+    return "unknown", EXIT_UNKNOWN
+
+
+_EXIT_TRADES = [
+    {"realized_pnl": pnl, "tp_fills": fills, "tp_count": 4,
+     "trailing_started": trailing, "sl_moved_to_be": at_be}
+    for pnl, fills, trailing, at_be in itertools.product(
+        (None, -25.0, -0.5, 0.0, 0.5, 25.0), (0, 1, 3, 4), (False, True), (False, True))
+]
+
+
+@pytest.mark.parametrize("trade", _EXIT_TRADES)
+def test_exit_table_matches_rule_chain(engine, trade):
+    assert engine._determine_exit_reason(trade) == _chained_exit_reason(trade)
+
+
+@pytest.mark.parametrize("trade, expected", [
+    ({"realized_pnl": 30.0, "tp_fills": 4, "tp_count": 4, "trailing_started": True}, "trailing_stop"),
+    ({"realized_pnl": -1.0, "tp_fills": 4, "tp_count": 4, "trailing_started": True}, "all_tps_hit"),
+    ({"realized_pnl": 0.2, "tp_fills": 1, "tp_count": 4, "sl_moved_to_be": True}, "breakeven"),
+    ({"realized_pnl": 5.0, "tp_fills": 2, "tp_count": 4, "sl_moved_to_be": True}, "tp2_then_sl"),
+    ({"realized_pnl": -20.0, "tp_fills": 0, "tp_count": 4}, "stop_loss"),
+    ({"realized_pnl": None, "tp_fills": 0, "tp_count": 4}, "unknown"),
+    ({}, "all_tps_hit"),  # no TPs placed counts as all of them hit
+])
+def test_exit_reason_precedence(engine, trade, expected):
+    assert engine._determine_exit_reason(trade)[0] == expected
+
+
+# ---------- step rounding ----------
+
+def _decimal_to_step(x, step, rounding):
+    d, s = Decimal(repr(x)), Decimal(repr(step))
+    return float((d / s).to_integral_value(rounding=rounding) * s)
+
+
+@pytest.mark.parametrize("step, prec", [(1.0, 0), (0.1, 1), (0.01, 2), (0.001, 3), (0.0001, 4), (0.5, 1), (0.25, 2)])
+def test_floor_to_step_on_and_below_boundaries(step, prec):
+    for n in range(1, 2000):
+        on = float(Decimal(n) * Decimal(repr(step)))
+        assert TradeEngine._floor_to_step(on, step, prec) == on
+        below = float(Decimal(repr(on)) - Decimal(repr(step)) / 10)
+        assert TradeEngine._floor_to_step(below, step, prec) == _decimal_to_step(below, step, ROUND_FLOOR)
+
+
+@pytest.mark.parametrize("x, step, prec, expected", [
+    (0.3, 0.1, 1, 0.3),      # floor(0.3 / 0.1) is 2 in plain floats
+    (4.35, 0.01, 2, 4.35),   # 4.35 * 100 is 434.99999999999994
+    (0.7 - 0.6, 0.1, 1, 0.1),
+    (12.3456, 0.001, 3, 12.345),
+    (5.0, 0.0, 2, 5.0),      # zero step leaves the value alone
+])
+def test_floor_to_step_values(x, step, prec, expected):
+    assert TradeEngine._floor_to_step(x, step, prec) == expected
+
+
+@pytest.mark.parametrize("tick, prec", [(0.1, 1), (0.01, 2), (0.0001, 4), (0.00001, 5), (0.5, 1)])
+def test_round_price_to_tick(tick, prec):
+    for n in range(1, 2000):
+        price = float(Decimal(n) * Decimal(repr(tick)) + Decimal(repr(tick)) * Decimal("0.3"))
+        got = TradeEngine._round_price(price, tick, prec)
+        assert got == _decimal_to_step(price, tick, ROUND_HALF_EVEN)
+        assert f"{got:.{prec}f}" == str(Decimal(repr(got)).quantize(Decimal(repr(tick))))
+
+
+def test_round_qty_floors_then_applies_min_qty(engine):
+    assert engine._round_qty(0.29, 0.1, 0.1, 1) == 0.2
+    assert engine._round_qty(0.05, 0.1, 0.1, 1) == 0.1
+    assert engine._round_qty(1.0, 0.1, 0.1, 1) == 1.0
+
+
+# ---------- TP split ----------
+
+def _tp_qtys(engine, monkeypatch, size, qty_step, min_qty, qty_prec, splits):
+    monkeypatch.setattr(trade_engine, "DRY_RUN", False)
+    monkeypatch.setattr(trade_engine, "TP_SPLITS", splits)
+    monkeypatch.setattr(engine, "_get_instrument_rules", lambda symbol: {
+        "qty_step": qty_step, "min_qty": min_qty, "tick_size": 0.0001,
+        "qty_prec": qty_prec, "price_prec": 4,
+    })
+    monkeypatch.setattr(engine, "position_size_avg", lambda symbol: (size, 1.0))
+    monkeypatch.setattr(engine, "_find_swing_point", lambda symbol, side, entry: None)
+    trade = {"id": "T", "symbol": "ABCUSDT", "order_side": "Buy", "entry_price": 1.0,
+             "tp_prices": [1.01, 1.02, 1.03, 1.04]}
+    engine.place_post_entry_orders(trade)
+    batch = engine.bybit.batches[-1] if engine.bybit.batches else []
+    return [(o["orderLinkId"], o["qty"]) for o in batch]
+
+
+@pytest.mark.parametrize("size, qty_step, min_qty, qty_prec, expected", [
+    (100.0, 1.0, 1.0, 0, [("T:TP1", "15"), ("T:TP2", "25"), ("T:TP3", "25"), ("T:TP4", "25")]),
+    (10.0, 0.1, 0.1, 1, [("T:TP1", "1.5"), ("T:TP2", "2.5"), ("T:TP3", "2.5"), ("T:TP4", "2.5")]),
+    # step boundary: 15% of 0.7 is 0.105, the running total reaches 0.3 at TP2
+    (0.7, 0.1, 0.1, 1, [("T:TP1", "0.1"), ("T:TP2", "0.1"), ("T:TP3", "0.2"), ("T:TP4", "0.2")]),
+    # TP1 below min_qty rolls into TP2; later TPs take the floored running total
+    (10.0, 1.0, 2.0, 0, [("T:TP2", "4"), ("T:TP3", "2"), ("T:TP4", "3")]),
+])
+def test_tp_split_quantities(engine, monkeypatch, size, qty_step, min_qty, qty_prec, expected):
+    got = _tp_qtys(engine, monkeypatch, size, qty_step, min_qty, qty_prec, [15.0, 25.0, 25.0, 25.0])
+    assert got == expected
+
+
+@pytest.mark.parametrize("size", [0.7, 1.3, 9.9, 13.7, 101.1, 2.9])
+def test_tp_split_never_exceeds_floored_total(engine, monkeypatch, size):
+    got = _tp_qtys(engine, monkeypatch, size, 0.1, 0.1, 1, [15.0, 25.0, 25.0, 25.0])
+    total_units = sum(round(float(q) * 10) for _, q in got)
+    assert total_units == int(Decimal(repr(size)) * 9)  # floor(90% of size) in 0.1 steps
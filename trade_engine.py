@@ -10,12 +10,21 @@ Features:
 
 import time
 import math
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Any, Dict, List, Optional
+import logging
+import bisect
+import itertools
+import queue
+import threading
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass, fields
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
 import sheets_export
 import telegram_alerts
 
+from bybit_v5 import Position
+from state import current_day_key, utc_day_key
 from config import (
     CATEGORY, ACCOUNT_TYPE, QUOTE, LEVERAGE, RISK_PCT, MARGIN_MODE,
     ENTRY_EXPIRATION_MIN, ENTRY_TOO_FAR_PCT, ENTRY_LIMIT_OFFSET_PCT,
@@ -26,6 +35,44 @@ from config import (
     DRY_RUN
 )
 
+# Statuses whose symbol is streamed on the ticker WS
+_ACTIVE_STATUSES = ("pending", "open")
+# Cached WS prices older than this fall back to a REST last_price call
+PRICE_MAX_AGE_SEC = 5.0
+# TP fills arrive on the order WS topic; the polling fallback is only a safety net
+TP_FALLBACK_INTERVAL_SEC = 60.0
+# Cleanup normally checks only trades with closing executions; every trade is
+# checked this often anyway, for closes the execution stream missed
+CLEANUP_FULL_SWEEP_SEC = 60.0
+# set_trading_stop updates for a symbol queued within this window go out as one call
+STOP_UPDATE_DEBOUNCE_SEC = 0.01
+# Archived trades kept in state["trade_history"] (oldest evicted first)
+TRADE_HISTORY_MAX = 500
+# Wallet equity is reused for this long (sizing bursts, export batches)
+EQUITY_TTL_SEC = 10.0
+# Integer exit codes stamped next to exit_reason at close (stats count by code)
+EXIT_UNKNOWN, EXIT_TRAILING, EXIT_ALL_TPS, EXIT_TP_THEN_SL, EXIT_BREAKEVEN, EXIT_SL = range(6)
+# exit_reason -> code, for trades archived before exit_code existed
+_EXIT_CODE_BY_REASON = {
+    "trailing_stop": EXIT_TRAILING,
+    "all_tps_hit": EXIT_ALL_TPS,
+    "breakeven": EXIT_BREAKEVEN,
+    "stop_loss": EXIT_SL,
+}
+# Fields shared by every TP order in a create-batch request; copied per order
+_TP_BODY_TEMPLATE = {
+    "orderType": "Limit",
+    "timeInForce": "GTC",
+    "reduceOnly": True,
+    "closeOnTrigger": False,
+}
+# Entry price factors from config: "too far" is this far past the trigger in
+# the trade's direction, the limit order sits this much better than entry
+_TOO_FAR_LONG = 1.0 + ENTRY_TOO_FAR_PCT / 100.0
+_TOO_FAR_SHORT = 1.0 - ENTRY_TOO_FAR_PCT / 100.0
+_LIMIT_OFFSET_LONG = 1.0 - ENTRY_LIMIT_OFFSET_PCT / 100.0
+_LIMIT_OFFSET_SHORT = 1.0 + ENTRY_LIMIT_OFFSET_PCT / 100.0
+
 
 def _opposite_side(side: str) -> str:
     return "Sell" if side == "Buy" else "Buy"
@@ -35,15 +82,288 @@ def _pos_side(side: str) -> str:
     return "Long" if side == "Buy" else "Short"
 
 
+def _decimals(step: str) -> int:
+    """Decimal places of an instruments-info step string ("0.010" -> 2)."""
+    return len(step.partition(".")[2].rstrip("0"))
+
+
+def _sl_sign(side: str) -> float:
+    """-1 for longs, +1 for shorts: the direction the SL lies from entry."""
+    return -1.0 if side == "Buy" else 1.0
+
+
+def _sl_price(entry: float, side: str, pct: float) -> float:
+    """Price pct% from entry on the SL side (negative pct: the TP side)."""
+    return entry * (1.0 + _sl_sign(side) * pct / 100.0)
+
+
+def _clamp_sl(extremum: float, entry: float, side: str,
+              buf_pct: float, min_pct: float, max_pct: float) -> Tuple[float, float]:
+    """SL beyond a swing extreme (plus buffer), clamped to min/max % from entry.
+
+    Returns (sl_price, unclamped distance % from entry).
+    """
+    sl = _sl_price(extremum, side, buf_pct)
+    d = _sl_sign(side) * (sl - entry) / entry * 100
+
+    if d < min_pct:  # structure too close, use minimum
+        return _sl_price(entry, side, min_pct), d
+    if d > max_pct:  # structure too far, use maximum
+        return _sl_price(entry, side, max_pct), d
+    return sl, d
+
+
+def _classify_exit(won: bool, lost: bool, flat: bool, trailing: bool,
+                   all_tps: bool, some_tps: bool, at_be: bool) -> int:
+    """Exit code for a closed trade's flags.
+
+    The checks overlap (a trailed trade usually hit every TP too), so the
+    order below is the precedence and must not be shuffled.
+    """
+    if won and trailing:
+        return EXIT_TRAILING
+    if all_tps:
+        return EXIT_ALL_TPS
+    if some_tps:
+        if flat and at_be:
+            return EXIT_BREAKEVEN
+        return EXIT_TP_THEN_SL
+    if lost:
+        return EXIT_SL
+    return EXIT_UNKNOWN
+
+
+# Every flag combination run through _classify_exit once at import
+_EXIT_TABLE = {flags: _classify_exit(*flags) for flags in itertools.product((False, True), repeat=7)}
+# exit code -> exit_reason (tp-then-SL reasons carry the fill count, see _determine_exit_reason)
+_EXIT_REASON = {code: reason for reason, code in _EXIT_CODE_BY_REASON.items()}
+_EXIT_REASON[EXIT_UNKNOWN] = "unknown"
+
+
+@dataclass(slots=True, frozen=True)
+class TradeRecord:
+    """A closed trade as archived to trade_history and exported to Sheets.
+
+    Immutable, so history snapshots can share the records without copying.
+    """
+    id: Optional[str] = None
+    symbol: Optional[str] = None
+    side: Optional[str] = None
+    entry_price: Optional[float] = None
+    trigger: Optional[float] = None
+    placed_ts: Optional[float] = None
+    filled_ts: Optional[float] = None
+    closed_ts: Optional[float] = None
+    realized_pnl: Optional[float] = None
+    is_win: Optional[bool] = None
+    exit_reason: Optional[str] = None
+    exit_code: Optional[int] = None
+    tp_fills: int = 0
+    tp_count: int = 0
+    dca_fills: int = 0
+    dca_count: int = 0
+    trailing_used: bool = False
+
+    @classmethod
+    def from_trade(cls, trade: Dict[str, Any]) -> "TradeRecord":
+        return cls(
+            id=trade.get("id"),
+            symbol=trade.get("symbol"),
+            side=trade.get("pos_side"),
+            entry_price=trade.get("entry_price"),
+            trigger=trade.get("trigger"),
+            placed_ts=trade.get("placed_ts"),
+            filled_ts=trade.get("filled_ts"),
+            closed_ts=trade.get("closed_ts"),
+            realized_pnl=trade.get("realized_pnl"),
+            is_win=trade.get("is_win"),
+            exit_reason=trade.get("exit_reason"),
+            exit_code=trade.get("exit_code"),
+            tp_fills=trade.get("tp_fills", 0),
+            # (expired trades never went through _fetch_and_store_trade_stats)
+            tp_count=trade["tp_count"] if "tp_count" in trade else len(trade.get("tp_prices") or []),
+            trailing_used=trade.get("trailing_started", False),
+        )
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "TradeRecord":
+        """Rebuild a record from its persisted (JSON) form."""
+        return cls(**{k: v for k, v in d.items() if k in _RECORD_FIELDS})
+
+
+_RECORD_FIELDS = frozenset(f.name for f in fields(TradeRecord))
+
+
 class TradeEngine:
-    def __init__(self, bybit, state: dict, logger):
+    def __init__(self, bybit, state: dict, logger, trades_lock: Optional[threading.Lock] = None):
         self.bybit = bybit
         self.state = state
         self.log = logger
-        self._instrument_cache: Dict[str, Dict[str, float]] = {}
-        self._cache_ttl = 300  # 5 min cache
-        self._cache_times: Dict[str, float] = {}
+        # Guards inserts/removals on state["open_trades"] (shared with main.py)
+        self.trades_lock = trades_lock or threading.Lock()
+        # Per-trade locks, sharded by trade id: work on one trade never waits
+        # for another trade's exchange round-trips
+        self._trade_locks = [threading.RLock() for _ in range(16)]
+        # status -> {trade id: trade}: open_trades partitioned by status, kept in
+        # sync by add_trade/set_status/_remove_trade (under trades_lock)
+        self._by_status: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        # symbol -> number of pending/open trades on it (ticker subscriptions)
+        self._ticker_refs: Dict[str, int] = {}
+        # orderLinkId -> trade id for every order the engine placed
+        self._order_to_trade: Dict[str, str] = {}
+        for tid, tr in self.state.get("open_trades", {}).items():
+            self._by_status[tr.get("status")][tid] = tr
+            self._order_to_trade.update(dict.fromkeys(self._order_links(tr), tid))
+            if tr.get("status") in _ACTIVE_STATUSES:
+                self._track_symbol(tr["symbol"], 1)
+        # Bounded archive of TradeRecords (persisted as dicts, rebuilt here);
+        # _snapshot_state turns it back into a list for JSON
+        self.state["trade_history"] = deque(
+            (TradeRecord.from_dict(t) if isinstance(t, dict) else t for t in self.state.get("trade_history") or ()),
+            maxlen=TRADE_HISTORY_MAX,
+        )
+        # "YYYY-MM-DD" (UTC close day) -> running stats of archived trades;
+        # seeded once from trade_history for states saved before it existed
+        self._day_keys: List[str] = []
+        if "stats_by_day" not in self.state:
+            self.state["stats_by_day"] = {}
+            for t in self.state.get("trade_history", []):
+                self._add_to_day_stats(t)
+        # stats_by_day keys in order, so a window is a bisected suffix
+        self._day_keys = sorted(self.state["stats_by_day"])
+        # symbol -> (last price, received at), fed by on_ticker
+        self._last_price: Dict[str, Tuple[float, float]] = {}
+        # symbol -> rules incl. fetched_at; lives in state so restarts reuse it.
+        # Tick/qty filters change on the order of months, hence the long TTL.
+        self._instrument_cache: Dict[str, Dict[str, float]] = self.state.setdefault("instrument_rules", {})
+        self._cache_ttl = 86400  # 24h cache
         self._last_stats_day: str = ""
+        self._last_tp_fallback = 0.0
+        # trade id -> (Future, BE price) of a fallback SL -> BE move still in flight
+        self._pending_be: Dict[str, Tuple[Future, float]] = {}
+        # Open trades with a closing execution since the last cleanup (under trades_lock)
+        self._dirty_trades: set = set()
+        self._last_full_cleanup = 0.0
+        self._equity_cache: Tuple[float, float] = (0.0, 0.0)  # (equity, fetched at)
+        # Long-lived pool for fanning out post-entry orders (SL + TPs)
+        self._io_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="te-io")
+        # symbol -> (merged set_trading_stop fields, futures waiting on them)
+        self._pending_stop_updates: Dict[str, Tuple[Dict[str, Any], List[Future]]] = {}
+        self._stop_lock = threading.Lock()
+        # Closed-trade rows for Google Sheets, written in batches off the cleanup path
+        self._sheets_q: queue.Queue = queue.Queue(maxsize=1000)
+        self._sheets_thread: Optional[threading.Thread] = None
+        if sheets_export.is_enabled():
+            self._sheets_thread = threading.Thread(target=self._sheets_worker, name="sheets-export", daemon=True)
+            self._sheets_thread.start()
+
+    def shutdown(self) -> None:
+        """Wait for in-flight order calls, stop the I/O pool, flush queued exports."""
+        self._io_pool.shutdown(wait=True)
+        if self._sheets_thread is not None:
+            self._sheets_q.put(None)
+            self._sheets_thread.join(timeout=30)
+
+    def trade_lock(self, trade_id: str) -> threading.RLock:
+        """Lock serializing all work on a single trade."""
+        return self._trade_locks[hash(trade_id) % len(self._trade_locks)]
+
+    def _trades_with_status(self, *statuses: str) -> List[tuple]:
+        with self.trades_lock:
+            return self.trades_with_status(*statuses)
+
+    # ---------- status index ----------
+    def add_trade(self, tr: Dict[str, Any]) -> None:
+        """Insert a new trade into state and the status index."""
+        subscribe = False
+        with self.trades_lock:
+            self.state.setdefault("open_trades", {})[tr["id"]] = tr
+            self._by_status[tr.get("status")][tr["id"]] = tr
+            if tr.get("status") in _ACTIVE_STATUSES:
+                subscribe = self._track_symbol(tr["symbol"], 1)
+        if subscribe:
+            self.bybit.subscribe_tickers([tr["symbol"]])
+
+    def set_status(self, tr: Dict[str, Any], status: str) -> None:
+        """Change a trade's status, keeping the status index in sync."""
+        unsubscribe = False
+        with self.trades_lock:
+            old = tr.get("status")
+            self._by_status[old].pop(tr["id"], None)
+            self._by_status[status][tr["id"]] = tr
+            tr["status"] = status
+            if old in _ACTIVE_STATUSES and status not in _ACTIVE_STATUSES:
+                unsubscribe = self._track_symbol(tr["symbol"], -1)
+        if unsubscribe:
+            self.bybit.unsubscribe_tickers([tr["symbol"]])
+            self._last_price.pop(tr["symbol"], None)
+
+    def _track_symbol(self, symbol: str, delta: int) -> bool:
+        """Adjust the symbol's active-trade count (caller holds trades_lock).
+
+        True if the ticker subscription has to change (0 -> 1 or 1 -> 0).
+        """
+        n = self._ticker_refs.get(symbol, 0) + delta
+        if n > 0:
+            self._ticker_refs[symbol] = n
+        else:
+            self._ticker_refs.pop(symbol, None)
+        return (n == 1 and delta > 0) or n == 0
+
+    def _remove_trade(self, tid: str) -> Dict[str, Any]:
+        # caller holds trades_lock
+        tr = self.state["open_trades"].pop(tid)
+        self._by_status[tr.get("status")].pop(tid, None)
+        for link in self._order_links(tr):
+            self._order_to_trade.pop(link, None)
+        self._pending_be.pop(tid, None)
+        return tr
+
+    @staticmethod
+    def _order_links(tr: Dict[str, Any]) -> List[str]:
+        """orderLinkIds the engine may have used for a trade (entry + TPs)."""
+        tid = tr["id"]
+        return [tid] + [f"{tid}:TP{n}" for n in range(1, len(tr.get("tp_prices") or ()) + 1)]
+
+    def status_count(self, *statuses: str) -> int:
+        """Number of trades in any of the given statuses (O(1) per status)."""
+        return sum(len(self._by_status.get(s, ())) for s in statuses)
+
+    def trades_with_status(self, *statuses: str) -> List[tuple]:
+        """(id, trade) pairs in the given statuses, copied from their partitions.
+
+        Caller holds trades_lock (_trades_with_status takes it).
+        """
+        return [item for s in statuses for item in self._by_status.get(s, {}).items()]
+
+    # ---------- price cache ----------
+    def on_ticker(self, data: Dict[str, Any]) -> None:
+        """Update the cached price from a tickers.{symbol} snapshot or delta."""
+        symbol = data.get("symbol")
+        if not symbol:
+            return
+        now = time.time()
+        last = data.get("lastPrice")
+        if last:
+            try:
+                self._last_price[symbol] = (float(last), now)
+            except ValueError:
+                pass
+        elif symbol in self._last_price:
+            # Deltas omit unchanged fields: price is the same, stream is alive
+            self._last_price[symbol] = (self._last_price[symbol][0], now)
+
+    def ticker_symbols(self) -> List[str]:
+        """Symbols with a pending or open trade (subscribed on WS connect)."""
+        with self.trades_lock:
+            return list(self._ticker_refs)
+
+    def _price(self, symbol: str) -> float:
+        """Last price from the ticker WS cache, REST if missing or stale."""
+        cached = self._last_price.get(symbol)
+        if cached and time.time() - cached[1] < PRICE_MAX_AGE_SEC:
+            return cached[0]
+        return self.bybit.last_price(CATEGORY, symbol)
 
     # ---------- startup sync ----------
     def startup_sync(self) -> None:
@@ -54,27 +374,20 @@ class TradeEngine:
 
         try:
             positions = self.bybit.positions(CATEGORY, "")
-            open_positions = [p for p in positions if float(p.get("size") or 0) > 0]
+            open_positions = {p.symbol: p for p in positions if p.size > 0}
 
             if not open_positions:
                 self.log.info("Startup sync: No open positions found")
                 return
 
-            tracked_symbols = set()
-            for tr in self.state.get("open_trades", {}).values():
-                if tr.get("status") in ("pending", "open"):
-                    tracked_symbols.add(tr.get("symbol"))
+            # Symbols with a pending/open trade
+            tracked_symbols = set(self.ticker_symbols())
 
             orphaned = []
-            for pos in open_positions:
-                symbol = pos.get("symbol")
-                size = float(pos.get("size") or 0)
-                side = pos.get("side")
-                entry = float(pos.get("avgPrice") or 0)
-                pnl = float(pos.get("unrealisedPnl") or 0)
-
-                if symbol not in tracked_symbols:
-                    orphaned.append(f"{symbol} ({side} {size} @ {entry}, PnL: {pnl:.2f})")
+            for symbol, pos in open_positions.items():
+                if symbol in tracked_symbols:
+                    continue
+                orphaned.append(f"{symbol} ({pos.side} {pos.size} @ {pos.avg_price}, PnL: {pos.unrealised_pnl:.2f})")
 
             if orphaned:
                 self.log.warning(f"Orphaned positions (not tracked):")
@@ -91,8 +404,7 @@ class TradeEngine:
 
     def log_daily_stats(self) -> None:
         """Log daily statistics once per day."""
-        from state import utc_day_key
-        today = utc_day_key()
+        today = current_day_key()
 
         if self._last_stats_day == today:
             return
@@ -106,42 +418,67 @@ class TradeEngine:
         self._last_stats_day = today
 
     # ---------- precision helpers ----------
+    # Both count in integer 10**-prec units (prec = the step's decimals), so
+    # results are the float nearest the decimal value: floor(0.3 / 0.1) is 2
+    # in floats, and 0.1 * 3 prints as 0.30000000000000004.
     @staticmethod
-    def _floor_to_step(x: float, step: float) -> float:
-        if step <= 0:
+    def _floor_to_step(x: float, step: float, prec: int) -> float:
+        scale = 10 ** prec
+        units = round(step * scale)
+        if units <= 0:
             return x
-        return math.floor(x / step) * step
+        # (epsilon: 4.35 * 100 is 434.99999999999994)
+        return math.floor(x * scale / units + 1e-9) * units / scale
 
     def _get_instrument_rules(self, symbol: str) -> Dict[str, float]:
         """Get instrument rules with caching."""
         now = time.time()
-        cached_time = self._cache_times.get(symbol, 0)
-
-        if symbol in self._instrument_cache and (now - cached_time) < self._cache_ttl:
-            return self._instrument_cache[symbol]
+        rules = self._instrument_cache.get(symbol)
+        # (entries persisted before qty_prec/price_prec existed get refetched)
+        if rules and (now - rules.get("fetched_at", 0)) < self._cache_ttl and "qty_prec" in rules:
+            return rules
 
         info = self.bybit.instruments_info(CATEGORY, symbol)
         lot = info.get("lotSizeFilter") or {}
         price_filter = info.get("priceFilter") or {}
-        qty_step = float(lot.get("qtyStep") or lot.get("basePrecision") or "0.000001")
+        qty_step = str(lot.get("qtyStep") or lot.get("basePrecision") or "0.000001")
         min_qty = float(lot.get("minOrderQty") or "0")
-        tick_size = float(price_filter.get("tickSize") or "0.0001")
+        tick_size = str(price_filter.get("tickSize") or "0.0001")
 
-        rules = {"qty_step": qty_step, "min_qty": min_qty, "tick_size": tick_size}
+        # Decimals to format qty/price with: exactly what the step allows
+        rules = {
+            "qty_step": float(qty_step), "min_qty": min_qty, "tick_size": float(tick_size),
+            "qty_prec": _decimals(qty_step), "price_prec": _decimals(tick_size),
+            "fetched_at": now,
+        }
         self._instrument_cache[symbol] = rules
-        self._cache_times[symbol] = now
         return rules
 
-    def _round_price(self, price: float, tick_size: float) -> float:
-        if tick_size <= 0:
+    def prefetch_instrument_rules(self, symbol: str) -> None:
+        """Warm the rules cache on the I/O pool so order placement doesn't wait on it."""
+        rules = self._instrument_cache.get(symbol)
+        if rules and (time.time() - rules.get("fetched_at", 0)) < self._cache_ttl:
+            return
+
+        def fetch():
+            try:
+                self._get_instrument_rules(symbol)
+            except Exception as e:
+                self.log.debug(f"Instrument prefetch failed for {symbol}: {e}")
+
+        self._io_pool.submit(fetch)
+
+    @staticmethod
+    def _round_price(price: float, tick_size: float, prec: int) -> float:
+        scale = 10 ** prec
+        units = round(tick_size * scale)
+        if units <= 0:
             return price
-        return round(round(price / tick_size) * tick_size, 10)
+        return round(price * scale / units) * units / scale
 
-    def _round_qty(self, qty: float, qty_step: float, min_qty: float) -> float:
-        qty = self._floor_to_step(qty, qty_step)
-        if qty < min_qty:
-            qty = min_qty
-        return float(f"{qty:.10f}")
+    def _round_qty(self, qty: float, qty_step: float, min_qty: float, qty_prec: int) -> float:
+        qty = self._floor_to_step(qty, qty_step, qty_prec)
+        return max(qty, min_qty)
 
     # ---------- dynamic SL based on structure ----------
     def _find_swing_point(self, symbol: str, side: str, entry_price: float) -> Optional[float]:
@@ -163,43 +500,17 @@ class TradeEngine:
 
             if side == "Buy":  # LONG: Find swing LOW
                 # Find the lowest low in recent candles
-                lows = [c["low"] for c in candles]
-                swing_low = min(lows)
-
-                # Add buffer below the swing low
-                sl_price = swing_low * (1 - SL_BUFFER_PCT / 100.0)
-
-                # Calculate distance from entry
-                distance_pct = (entry_price - sl_price) / entry_price * 100
-
+                extremum = min(c["low"] for c in candles)
             else:  # SHORT (Sell): Find swing HIGH
                 # Find the highest high in recent candles
-                highs = [c["high"] for c in candles]
-                swing_high = max(highs)
-
-                # Add buffer above the swing high
-                sl_price = swing_high * (1 + SL_BUFFER_PCT / 100.0)
-
-                # Calculate distance from entry
-                distance_pct = (sl_price - entry_price) / entry_price * 100
+                extremum = max(c["high"] for c in candles)
 
-            # Clamp between min and max
+            sl_price, distance_pct = _clamp_sl(extremum, entry_price, side,
+                                               SL_BUFFER_PCT, SL_MIN_PCT, SL_MAX_PCT)
             if distance_pct < SL_MIN_PCT:
-                # Structure too close, use minimum
-                if side == "Buy":
-                    sl_price = entry_price * (1 - SL_MIN_PCT / 100.0)
-                else:
-                    sl_price = entry_price * (1 + SL_MIN_PCT / 100.0)
                 self.log.info(f"SL clamped to MIN {SL_MIN_PCT}% (structure was {distance_pct:.1f}%)")
-
             elif distance_pct > SL_MAX_PCT:
-                # Structure too far, use maximum
-                if side == "Buy":
-                    sl_price = entry_price * (1 - SL_MAX_PCT / 100.0)
-                else:
-                    sl_price = entry_price * (1 + SL_MAX_PCT / 100.0)
                 self.log.info(f"SL clamped to MAX {SL_MAX_PCT}% (structure was {distance_pct:.1f}%)")
-
             else:
                 self.log.info(f"SL at structure: {distance_pct:.1f}% from entry")
 
@@ -211,13 +522,13 @@ class TradeEngine:
 
     def calc_base_qty(self, symbol: str, entry_price: float) -> float:
         """Calculate position size based on risk percentage."""
-        equity = self.bybit.wallet_equity(ACCOUNT_TYPE)
+        equity = self._equity()
         margin = equity * (RISK_PCT / 100.0)
         notional = margin * LEVERAGE
         qty = notional / entry_price
 
         rules = self._get_instrument_rules(symbol)
-        final_qty = self._round_qty(qty, rules["qty_step"], rules["min_qty"])
+        final_qty = self._round_qty(qty, rules["qty_step"], rules["min_qty"], rules["qty_prec"])
 
         # Log position sizing details
         self.log.info(f"Position sizing: equity=${equity:.2f}, margin=${margin:.2f}, "
@@ -229,30 +540,37 @@ class TradeEngine:
     def _too_far(self, side: str, last: float, trigger: float) -> bool:
         """Check if price already moved too far past entry."""
         if side == "Sell":
-            return last <= trigger * (1 - ENTRY_TOO_FAR_PCT / 100.0)
-        return last >= trigger * (1 + ENTRY_TOO_FAR_PCT / 100.0)
+            return last <= trigger * _TOO_FAR_SHORT
+        return last >= trigger * _TOO_FAR_LONG
+
+    def _equity(self) -> float:
+        """Wallet equity, refetched at most every EQUITY_TTL_SEC."""
+        equity, ts = self._equity_cache
+        now = time.time()
+        if now - ts < EQUITY_TTL_SEC:
+            return equity
+        equity = self.bybit.wallet_equity(ACCOUNT_TYPE)
+        self._equity_cache = (equity, now)
+        return equity
 
     # ---------- position helpers ----------
-    def _position(self, symbol: str) -> Optional[Dict[str, Any]]:
+    def _position(self, symbol: str) -> Optional[Position]:
+        # /v5/position/list is already filtered by symbol
         plist = self.bybit.positions(CATEGORY, symbol)
-        for p in plist:
-            if p.get("symbol") == symbol:
-                return p
-        return None
+        return plist[0] if plist else None
 
     def position_size_avg(self, symbol: str) -> tuple[float, float]:
         p = self._position(symbol)
         if not p:
             return 0.0, 0.0
-        size = float(p.get("size") or 0)
-        avg = float(p.get("avgPrice") or 0)
-        return size, avg
+        return p.size, p.avg_price
 
     # ---------- core actions ----------
-    def place_entry_order(self, sig: Dict[str, Any], trade_id: str) -> Optional[str]:
+    def place_entry_order(self, sig: Dict[str, Any], trade_id: str) -> Tuple[Optional[str], float]:
         """
         Place a limit entry order.
         Entry is placed 0.1% BETTER than signal price (more likely to fill).
+        Returns (order_id, base_qty); order_id is None if nothing was placed.
         """
         symbol = sig["symbol"]
         side = "Sell" if sig["side"] == "sell" else "Buy"
@@ -270,22 +588,19 @@ class TradeEngine:
             if "not modified" not in str(e).lower():
                 self.log.warning(f"set_leverage/margin failed for {symbol}: {e}")
 
-        last = self.bybit.last_price(CATEGORY, symbol)
+        last = self._price(symbol)
         if self._too_far(side, last, entry_price):
             self.log.info(f"SKIP {symbol} - price too far (last={last}, entry={entry_price})")
-            return None
+            return None, 0.0
 
         rules = self._get_instrument_rules(symbol)
         tick_size = rules["tick_size"]
+        qp, pp = rules["qty_prec"], rules["price_prec"]
 
         # Calculate limit price: 0.1% BETTER than signal entry
-        offset = ENTRY_LIMIT_OFFSET_PCT / 100.0
-        if side == "Buy":  # LONG: buy slightly lower
-            limit_price = entry_price * (1 - offset)
-        else:  # SHORT: sell slightly higher
-            limit_price = entry_price * (1 + offset)
-
-        limit_price = self._round_price(limit_price, tick_size)
+        # (LONG buys slightly lower, SHORT sells slightly higher)
+        offset = _LIMIT_OFFSET_SHORT if side == "Sell" else _LIMIT_OFFSET_LONG
+        limit_price = self._round_price(entry_price * offset, tick_size, pp)
         qty = self.calc_base_qty(symbol, entry_price)
 
         body = {
@@ -293,8 +608,8 @@ class TradeEngine:
             "symbol": symbol,
             "side": side,
             "orderType": "Limit",
-            "qty": f"{qty:.10f}",
-            "price": f"{limit_price:.10f}",
+            "qty": f"{qty:.{qp}f}",
+            "price": f"{limit_price:.{pp}f}",
             "timeInForce": "GTC",
             "reduceOnly": False,
             "closeOnTrigger": False,
@@ -303,8 +618,9 @@ class TradeEngine:
 
         if DRY_RUN:
             self.log.info(f"DRY_RUN ENTRY {symbol}: {body}")
-            return "DRY_RUN"
+            return "DRY_RUN", qty
 
+        self._order_to_trade[trade_id] = trade_id
         try:
             self.log.debug(f"Bybit place_order: {body}")
             resp = self.bybit.place_order(body)
@@ -314,10 +630,10 @@ class TradeEngine:
                 self.log.info(f"Entry order created: {symbol} orderId={oid}")
             else:
                 self.log.warning(f"No orderId in response: {resp}")
-            return oid
+            return oid, qty
         except Exception as e:
             self.log.error(f"Entry order FAILED for {symbol}: {e}")
-            return None
+            return None, qty
 
     def cancel_entry(self, symbol: str, order_id: str) -> None:
         body = {"category": CATEGORY, "symbol": symbol, "orderId": order_id}
@@ -342,6 +658,7 @@ class TradeEngine:
         tick_size = rules["tick_size"]
         qty_step = rules["qty_step"]
         min_qty = rules["min_qty"]
+        qp, pp = rules["qty_prec"], rules["price_prec"]
 
         # Get position size
         size, _avg = self.position_size_avg(symbol)
@@ -354,20 +671,13 @@ class TradeEngine:
 
         if sl_price is None:
             # Fallback to fixed SL if structure detection fails
-            sl_pct = SL_PCT / 100.0
-            if side == "Sell":  # SHORT: SL above entry
-                sl_price = entry * (1 + sl_pct)
-            else:  # LONG: SL below entry
-                sl_price = entry * (1 - sl_pct)
+            sl_price = _sl_price(entry, side, SL_PCT)
             self.log.info(f"Using fallback SL at {SL_PCT}%: {sl_price}")
 
-        sl_price = self._round_price(sl_price, tick_size)
+        sl_price = self._round_price(sl_price, tick_size, pp)
 
         # Calculate and log the actual SL distance
-        if side == "Sell":
-            sl_distance_pct = (sl_price - entry) / entry * 100
-        else:
-            sl_distance_pct = (entry - sl_price) / entry * 100
+        sl_distance_pct = _sl_sign(side) * (sl_price - entry) / entry * 100
         self.log.info(f"Final SL: {sl_price} ({sl_distance_pct:.2f}% from entry)")
 
         # Store SL info in trade for analytics
@@ -381,15 +691,12 @@ class TradeEngine:
             self.log.warning(f"No TP prices for {symbol} - using fallback TPs")
             # Fallback: Generate TPs at 1%, 2%, 3%, 4% from entry
             for pct in [1.0, 2.0, 3.0, 4.0]:
-                if side == "Sell":  # SHORT: TPs below entry
-                    tp = entry * (1 - pct / 100.0)
-                else:  # LONG: TPs above entry
-                    tp = entry * (1 + pct / 100.0)
-                tp_prices.append(self._round_price(tp, tick_size))
+                tp_prices.append(self._round_price(_sl_price(entry, side, -pct), tick_size, pp))
             trade["tp_prices"] = tp_prices
 
         # Build TP orders - handle minimum quantity requirements
         tp_orders = []
+        tp_side = _opposite_side(side)
         tp_to_place = min(len(tp_prices), len(TP_SPLITS))
         splits_sum = sum(TP_SPLITS[:tp_to_place])
         runner_pct = 100 - splits_sum
@@ -398,72 +705,52 @@ class TradeEngine:
 
         # Calculate total qty for TPs (excluding runner)
         tp_total_pct = splits_sum
-        remaining_qty = self._floor_to_step(size * (tp_total_pct / 100.0), qty_step)
+        remaining_qty = self._floor_to_step(size * (tp_total_pct / 100.0), qty_step, qp)
 
         # Check if position is too small for splits
         if remaining_qty < min_qty:
             # Position too small for TP splits - place single TP at last TP price
             self.log.warning(f"Position too small for TP splits ({size} < {min_qty * 4}). Placing single TP.")
             if tp_prices:
-                last_tp = self._round_price(float(tp_prices[-1]), tick_size)
-                tp_qty = self._floor_to_step(size * 0.9, qty_step)  # 90%, keep 10% runner
+                last_tp = self._round_price(float(tp_prices[-1]), tick_size, pp)
+                tp_qty = self._floor_to_step(size * 0.9, qty_step, qp)  # 90%, keep 10% runner
                 if tp_qty >= min_qty:
-                    tp_orders.append({
-                        "idx": 0,
-                        "body": {
-                            "category": CATEGORY,
-                            "symbol": symbol,
-                            "side": _opposite_side(side),
-                            "orderType": "Limit",
-                            "qty": f"{tp_qty}",
-                            "price": f"{last_tp:.10f}",
-                            "timeInForce": "GTC",
-                            "reduceOnly": True,
-                            "closeOnTrigger": False,
-                            "orderLinkId": f"{trade['id']}:TP1",
-                        }
-                    })
+                    body = _TP_BODY_TEMPLATE.copy()
+                    body.update(symbol=symbol, side=tp_side, qty=f"{tp_qty:.{qp}f}",
+                                price=f"{last_tp:.{pp}f}", orderLinkId=f"{trade['id']}:TP1")
+                    tp_orders.append({"idx": 0, "body": body})
+                    self._order_to_trade[body["orderLinkId"]] = trade["id"]
                 else:
                     self.log.warning(f"Position too small for ANY TP order ({tp_qty} < {min_qty}). Only SL set.")
         else:
-            # Normal flow: place individual TPs
-            accumulated_pct = 0.0
+            # Normal flow: place individual TPs. Each TP takes the floored
+            # running total (in qty_step units) minus what earlier TPs took,
+            # so a TP below min_qty simply rolls into the next one.
+            cum_qty = 0.0
+            placed_units = 0
+            scale = 10 ** qp
+            step_units = round(qty_step * scale)
             for idx in range(tp_to_place):
                 pct = float(TP_SPLITS[idx])
                 if pct <= 0:
                     continue
 
-                tp = self._round_price(float(tp_prices[idx]), tick_size)
-                raw_qty = size * (pct / 100.0)
-                qty = self._floor_to_step(raw_qty, qty_step)
+                cum_qty += size * (pct / 100.0)
+                units = math.floor(cum_qty * scale / step_units + 1e-9)
+                qty = (units - placed_units) * step_units / scale
 
                 # Skip if quantity would be below minimum
                 if qty < min_qty:
                     self.log.debug(f"Skipping TP{idx+1}: qty {qty} < min_qty {min_qty}")
-                    accumulated_pct += pct
                     continue
+                placed_units = units
 
-                # If we accumulated skipped TPs, add them to this one
-                if accumulated_pct > 0:
-                    extra_qty = self._floor_to_step(size * (accumulated_pct / 100.0), qty_step)
-                    qty = self._floor_to_step(qty + extra_qty, qty_step)
-                    accumulated_pct = 0.0
-
-                tp_orders.append({
-                    "idx": idx,
-                    "body": {
-                        "category": CATEGORY,
-                        "symbol": symbol,
-                        "side": _opposite_side(side),
-                        "orderType": "Limit",
-                        "qty": f"{qty}",
-                        "price": f"{tp:.10f}",
-                        "timeInForce": "GTC",
-                        "reduceOnly": True,
-                        "closeOnTrigger": False,
-                        "orderLinkId": f"{trade['id']}:TP{idx+1}",
-                    }
-                })
+                tp = self._round_price(float(tp_prices[idx]), tick_size, pp)
+                body = _TP_BODY_TEMPLATE.copy()
+                body.update(symbol=symbol, side=tp_side, qty=f"{qty:.{qp}f}",
+                            price=f"{tp:.{pp}f}", orderLinkId=f"{trade['id']}:TP{idx+1}")
+                tp_orders.append({"idx": idx, "body": body})
+                self._order_to_trade[body["orderLinkId"]] = trade["id"]
 
         self.log.info(f"Created {len(tp_orders)} TP order(s)")
 
@@ -472,7 +759,7 @@ class TradeEngine:
             "category": CATEGORY,
             "symbol": symbol,
             "positionIdx": 0,
-            "stopLoss": f"{sl_price:.10f}",
+            "stopLoss": f"{sl_price:.{pp}f}",
             "tpslMode": "Full",
         }
 
@@ -484,37 +771,35 @@ class TradeEngine:
                 if o['idx'] == 0:
                     trade["tp1_order_id"] = "DRY_TP1"
         else:
-            # Place SL + TPs in parallel
-            def place_order(order_tuple):
-                order_type, o = order_tuple
-                resp = self.bybit.place_order(o["body"])
-                return order_type, o["idx"], (resp.get("result") or {}).get("orderId")
+            # All TPs go out in one create-batch request on the I/O pool
+            # while this thread sets the SL
+            batch_future = None
+            if tp_orders:
+                batch = [o["body"] for o in tp_orders]
+                batch_future = self._io_pool.submit(self.bybit.place_batch_order, CATEGORY, batch)
 
-            def set_sl():
+            try:
                 self.bybit.set_trading_stop(ts_body)
-                return "SL", 0, None
-
-            all_orders = [("TP", o) for o in tp_orders]
-
-            with ThreadPoolExecutor(max_workers=5) as executor:
-                sl_future = executor.submit(set_sl)
-                order_futures = [executor.submit(place_order, o) for o in all_orders]
+                self.log.info(f"SL set successfully")
+            except Exception as e:
+                self.log.warning(f"SL setting failed: {e}")
 
+            if batch_future is not None:
                 try:
-                    sl_future.result()
-                    self.log.info(f"SL set successfully")
+                    resp = batch_future.result()
+                    results = (resp.get("result") or {}).get("list") or []
+                    errors = (resp.get("retExtInfo") or {}).get("list") or []
+                    for i, o in enumerate(tp_orders):
+                        err = errors[i] if i < len(errors) else {}
+                        oid = results[i].get("orderId") if i < len(results) else None
+                        if err.get("code") not in (None, 0, "0") or not oid:
+                            self.log.warning(f"TP{o['idx']+1} placement failed: {err.get('msg') or err}")
+                            continue
+                        trade.setdefault("tp_order_ids", {})[str(o['idx']+1)] = oid
+                        if o['idx'] == 0:
+                            trade["tp1_order_id"] = oid
                 except Exception as e:
-                    self.log.warning(f"SL setting failed: {e}")
-
-                for future in as_completed(order_futures):
-                    try:
-                        order_type, idx, oid = future.result()
-                        if order_type == "TP":
-                            trade.setdefault("tp_order_ids", {})[str(idx+1)] = oid
-                            if idx == 0:
-                                trade["tp1_order_id"] = oid
-                    except Exception as e:
-                        self.log.warning(f"Order placement failed: {e}")
+                    self.log.warning(f"Order placement failed: {e}")
 
         trade["post_orders_placed"] = True
 
@@ -522,19 +807,75 @@ class TradeEngine:
     def on_execution(self, ev: Dict[str, Any]) -> None:
         """Handle execution events from WebSocket."""
         link = ev.get("orderLinkId") or ev.get("orderLinkID") or ""
+        if "execPnl" in ev and float(ev.get("closedSize") or 0) > 0:
+            self._record_close_fill(ev, link)
         if not link:
             return
 
+        with self.trade_lock(link.split(":", 1)[0]):
+            if ":" not in link:
+                self._record_entry_fill(ev, link)
+            self._handle_execution(ev, link)
+
+    def _record_entry_fill(self, ev: Dict[str, Any], link: str) -> None:
+        """Add an entry execution's size and fee to its trade (caller holds the trade lock)."""
+        tr = self.state.get("open_trades", {}).get(link)
+        qty = float(ev.get("execQty") or 0)
+        if tr is None or qty <= 0:
+            return
+        tr["ws_entry_qty"] = tr.get("ws_entry_qty", 0.0) + qty
+        tr["ws_fees"] = tr.get("ws_fees", 0.0) + float(ev.get("execFee") or 0)
+
+    def _record_close_fill(self, ev: Dict[str, Any], link: str) -> None:
+        """Add a closing execution's size, PnL and fee to its trade.
+
+        TP executions map by orderLinkId. SL/trailing closes are placed by the
+        exchange without a link, so they're attributed only when a single open
+        trade holds the symbol.
+        """
+        with self.trades_lock:
+            if link:
+                tr = self.state.get("open_trades", {}).get(link.split(":", 1)[0])
+                if tr is not None:
+                    self._dirty_trades.add(tr["id"])
+            else:
+                symbol = ev.get("symbol")
+                holders = [t for t in self._by_status.get("open", {}).values() if t["symbol"] == symbol]
+                # Any of them may be the one closed: let cleanup check them all
+                self._dirty_trades.update(t["id"] for t in holders)
+                tr = holders[0] if len(holders) == 1 else None
+        if tr is None:
+            return
+        with self.trade_lock(tr["id"]):
+            tr["ws_closed_qty"] = tr.get("ws_closed_qty", 0.0) + float(ev.get("closedSize") or 0)
+            tr["ws_realized_pnl"] = tr.get("ws_realized_pnl", 0.0) + float(ev.get("execPnl") or 0)
+            tr["ws_fees"] = tr.get("ws_fees", 0.0) + float(ev.get("execFee") or 0)
+
+    def on_order(self, ev: Dict[str, Any]) -> bool:
+        """Handle order-status events: a filled TP is applied like its execution.
+
+        Returns True if the event touched a trade.
+        """
+        link = ev.get("orderLinkId") or ""
+        if ev.get("orderStatus") != "Filled" or ":TP" not in link:
+            return False
+        with self.trade_lock(link.split(":", 1)[0]):
+            self._handle_execution(ev, link)
+        return True
+
+    def _handle_execution(self, ev: Dict[str, Any], link: str) -> None:
+        """Apply an execution to its trade (caller holds the trade lock)."""
+        open_trades = self.state.get("open_trades", {})
         # Entry filled?
-        if link in self.state.get("open_trades", {}):
-            tr = self.state["open_trades"][link]
+        tr = open_trades.get(link)
+        if tr is not None:
             if tr.get("status") == "pending":
                 exec_price = ev.get("execPrice") or ev.get("price") or ev.get("lastPrice") or tr.get("trigger")
                 try:
                     tr["entry_price"] = float(exec_price)
                 except Exception:
                     pass
-                tr["status"] = "open"
+                self.set_status(tr, "open")
                 tr["filled_ts"] = time.time()
                 tr.setdefault("tp_fills", 0)
                 tr.setdefault("tp_fills_list", [])
@@ -553,20 +894,18 @@ class TradeEngine:
                     self.log.warning(f"Post-entry orders failed (will retry): {e}")
             return
 
-        # TP fills
-        if ":TP" in link:
-            trade_id, tp_tag = link.split(":", 1)
-            tr = self.state.get("open_trades", {}).get(trade_id)
+        # TP fills ("{trade_id}:TP{n}")
+        trade_id, sep, tp_tag = link.rpartition(":")
+        if sep and tp_tag.startswith("TP"):
+            tr = open_trades.get(trade_id)
             if not tr:
                 return
 
-            import re as _re
-            m = _re.search(r"TP(\d+)", tp_tag)
-            if not m:
+            try:
+                tp_num = int(tp_tag[2:])
+            except ValueError:
                 return
 
-            tp_num = int(m.group(1))
-
             # Track TP fill
             filled_tps = tr.get("tp_fills_list", [])
             if tp_num not in filled_tps:
@@ -589,34 +928,60 @@ class TradeEngine:
                 tr["trailing_started"] = True
                 self.log.info(f"TRAILING STARTED {tr['symbol']} after TP{tp_num}")
 
-    def _move_sl(self, symbol: str, sl_price: float, max_retries: int = 3) -> bool:
-        """Move SL with retry logic."""
+    def _move_sl(self, symbol: str, sl_price: float) -> Future:
+        """Queue an SL move; the Future resolves to True once Bybit accepted it."""
         rules = self._get_instrument_rules(symbol)
-        sl_price = self._round_price(sl_price, rules["tick_size"])
-        body = {
-            "category": CATEGORY,
-            "symbol": symbol,
-            "positionIdx": 0,
-            "stopLoss": f"{sl_price:.10f}",
-            "tpslMode": "Full",
-        }
+        pp = rules["price_prec"]
+        sl_price = self._round_price(sl_price, rules["tick_size"], pp)
+        stop_fields = {"stopLoss": f"{sl_price:.{pp}f}"}
 
         if DRY_RUN:
-            self.log.info(f"DRY_RUN move SL: {body}")
-            return True
+            self.log.info(f"DRY_RUN move SL {symbol}: {stop_fields}")
+            done: Future = Future()
+            done.set_result(True)
+            return done
 
-        for attempt in range(max_retries):
-            try:
-                self.bybit.set_trading_stop(body)
-                return True
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    self.log.warning(f"SL move attempt {attempt+1} failed: {e}")
-                    time.sleep(0.1)
-                else:
-                    self.log.error(f"SL move FAILED after {max_retries} attempts: {e}")
-                    return False
-        return False
+        return self._queue_stop_update(symbol, stop_fields)
+
+    def _queue_stop_update(self, symbol: str, stop_fields: Dict[str, Any]) -> Future:
+        """Merge fields into the symbol's pending set_trading_stop call.
+
+        The first update schedules a flush on the I/O pool; anything queued for
+        the symbol before it runs (e.g. SL -> BE and trailing from one burst of
+        TP fills) rides along in the same request.
+        """
+        fut: Future = Future()
+        with self._stop_lock:
+            schedule = not self._pending_stop_updates
+            merged, waiters = self._pending_stop_updates.setdefault(symbol, ({}, []))
+            merged.update(stop_fields)
+            waiters.append(fut)
+        if schedule:
+            self._io_pool.submit(self._flush_stop_updates)
+        return fut
+
+    def _flush_stop_updates(self, max_retries: int = 3) -> None:
+        """Send one set_trading_stop per symbol with its merged fields, with retries."""
+        time.sleep(STOP_UPDATE_DEBOUNCE_SEC)
+        with self._stop_lock:
+            pending, self._pending_stop_updates = self._pending_stop_updates, {}
+
+        for symbol, (stop_fields, waiters) in pending.items():
+            body = {"category": CATEGORY, "symbol": symbol, "positionIdx": 0, "tpslMode": "Full", **stop_fields}
+            ok = False
+            for attempt in range(max_retries):
+                try:
+                    self.bybit.set_trading_stop(body)
+                    ok = True
+                    break
+                except Exception as e:
+                    if attempt < max_retries - 1:
+                        self.log.warning(f"Stop update attempt {attempt+1} failed for {symbol}: {e}")
+                        time.sleep(0.1)
+                    else:
+                        self.log.error(f"Stop update FAILED for {symbol} after {max_retries} attempts: {e}")
+            for fut in waiters:
+                fut.set_result(ok)
 
     def _start_trailing(self, tr: Dict[str, Any], tp_num: int) -> None:
         """Start trailing stop after TPn is hit."""
@@ -626,132 +991,152 @@ class TradeEngine:
 
         rules = self._get_instrument_rules(symbol)
         tick_size = rules["tick_size"]
+        pp = rules["price_prec"]
 
-        current_price = self.bybit.last_price(CATEGORY, symbol)
+        current_price = self._price(symbol)
 
         if len(tp_prices) < tp_num:
             anchor = current_price
         else:
             anchor = float(tp_prices[tp_num - 1])
 
-        anchor = self._round_price(anchor, tick_size)
-        dist = self._round_price(anchor * (TRAIL_DISTANCE_PCT / 100.0), tick_size)
+        anchor = self._round_price(anchor, tick_size, pp)
+        dist = self._round_price(anchor * (TRAIL_DISTANCE_PCT / 100.0), tick_size, pp)
 
-        body = {
-            "category": CATEGORY,
-            "symbol": symbol,
-            "positionIdx": 0,
-            "tpslMode": "Full",
-            "trailingStop": f"{dist:.10f}",
-        }
+        stop_fields = {"trailingStop": f"{dist:.{pp}f}"}
 
         # Set active price only if not yet reached
         if side == "Sell":  # SHORT
             if anchor < current_price:
-                body["activePrice"] = f"{anchor:.10f}"
+                stop_fields["activePrice"] = f"{anchor:.{pp}f}"
         else:  # LONG
             if anchor > current_price:
-                body["activePrice"] = f"{anchor:.10f}"
+                stop_fields["activePrice"] = f"{anchor:.{pp}f}"
 
         # Keep SL at BE if already moved
         if tr.get("sl_moved_to_be"):
             be_price = float(tr.get("entry_price") or tr.get("trigger"))
-            be_price = self._round_price(be_price, tick_size)
-            body["stopLoss"] = f"{be_price:.10f}"
+            be_price = self._round_price(be_price, tick_size, pp)
+            stop_fields["stopLoss"] = f"{be_price:.{pp}f}"
 
         if DRY_RUN:
-            self.log.info(f"DRY_RUN set trailing: {body}")
+            self.log.info(f"DRY_RUN set trailing {symbol}: {stop_fields}")
             return
 
-        try:
-            self.bybit.set_trading_stop(body)
-            self.log.info(f"Trailing started for {symbol} (dist: {dist})")
-        except Exception as e:
-            self.log.warning(f"Failed to set trailing for {symbol}: {e}")
+        # Failures are logged by the flush
+        self._queue_stop_update(symbol, stop_fields)
+        self.log.info(f"Trailing queued for {symbol} (dist: {dist})")
 
     # ---------- maintenance ----------
     def check_tp_fills_fallback(self) -> None:
-        """Polling fallback for TP1 fills."""
+        """Polling fallback for TP1 fills (runs at most every TP_FALLBACK_INTERVAL_SEC)."""
         if DRY_RUN:
             return
+        now = time.time()
+        if now - self._last_tp_fallback < TP_FALLBACK_INTERVAL_SEC:
+            return
+        self._last_tp_fallback = now
 
-        for tid, tr in list(self.state.get("open_trades", {}).items()):
-            if tr.get("status") != "open":
-                continue
-            if not tr.get("post_orders_placed"):
-                continue
-            if tr.get("sl_moved_to_be"):
-                continue
+        for tid, tr in self._trades_with_status("open"):
+            with self.trade_lock(tid):
+                self._check_tp1_fallback(tr)
 
-            symbol = tr["symbol"]
-            side = tr["order_side"]
-            tp_prices = tr.get("tp_prices") or []
+    def _check_tp1_fallback(self, tr: Dict[str, Any]) -> None:
+        """Move SL to BE if TP1 filled or price passed it (caller holds trade lock)."""
+        if tr.get("status") != "open":
+            return
+        if not tr.get("post_orders_placed"):
+            return
+        if tr.get("sl_moved_to_be"):
+            return
 
-            if not tp_prices:
-                continue
+        # A move queued on an earlier tick: never wait on the I/O pool while
+        # holding the trade lock, just look again next time
+        pending = self._pending_be.pop(tr["id"], None)
+        if pending is not None:
+            if not pending[0].done():
+                self._pending_be[tr["id"]] = pending
+                return
+            if self._finish_fallback_be(tr, *pending):
+                return
 
-            tp1_price = float(tp_prices[0])
-            should_move_to_be = False
+        symbol = tr["symbol"]
+        side = tr["order_side"]
+        tp_prices = tr.get("tp_prices") or []
 
-            # Check if TP1 order filled
-            tp1_oid = tr.get("tp1_order_id")
-            if tp1_oid:
-                try:
-                    open_orders = self.bybit.open_orders(CATEGORY, symbol)
-                    tp1_still_open = any(o.get("orderId") == tp1_oid for o in open_orders)
-                    if not tp1_still_open:
-                        should_move_to_be = True
-                except Exception:
-                    pass
+        if not tp_prices:
+            return
 
-            # Check if price passed TP1
-            if not should_move_to_be:
-                try:
-                    current_price = self.bybit.last_price(CATEGORY, symbol)
-                    if side == "Buy" and current_price >= tp1_price:
-                        should_move_to_be = True
-                        self.log.info(f"Price passed TP1 for {symbol}")
-                    elif side == "Sell" and current_price <= tp1_price:
-                        should_move_to_be = True
-                        self.log.info(f"Price passed TP1 for {symbol}")
-                except Exception:
-                    pass
+        tp1_price = float(tp_prices[0])
+        should_move_to_be = False
 
-            if should_move_to_be:
-                be = float(tr.get("entry_price") or tr.get("trigger"))
-                if self._move_sl(symbol, be):
-                    tr["sl_moved_to_be"] = True
-                    if 1 not in tr.get("tp_fills_list", []):
-                        tr.setdefault("tp_fills_list", []).append(1)
-                        tr["tp_fills"] = len(tr["tp_fills_list"])
-                    self.log.info(f"SL -> BE (fallback) {symbol} @ {be}")
+        # Check if TP1 order filled
+        tp1_oid = tr.get("tp1_order_id")
+        if tp1_oid:
+            try:
+                open_orders = self.bybit.open_orders(CATEGORY, symbol)
+                tp1_still_open = any(o.get("orderId") == tp1_oid for o in open_orders)
+                if not tp1_still_open:
+                    should_move_to_be = True
+            except Exception:
+                pass
+
+        # Check if price passed TP1
+        if not should_move_to_be:
+            try:
+                current_price = self._price(symbol)
+                if side == "Buy" and current_price >= tp1_price:
+                    should_move_to_be = True
+                    self.log.info(f"Price passed TP1 for {symbol}")
+                elif side == "Sell" and current_price <= tp1_price:
+                    should_move_to_be = True
+                    self.log.info(f"Price passed TP1 for {symbol}")
+            except Exception:
+                pass
+
+        if should_move_to_be:
+            be = float(tr.get("entry_price") or tr.get("trigger"))
+            fut = self._move_sl(symbol, be)
+            if fut.done():
+                self._finish_fallback_be(tr, fut, be)
+            else:
+                self._pending_be[tr["id"]] = (fut, be)
+
+    def _finish_fallback_be(self, tr: Dict[str, Any], fut: Future, be: float) -> bool:
+        """Stamp a finished fallback SL -> BE move (caller holds trade lock). True if it went through."""
+        if fut.exception() is not None or not fut.result():
+            return False
+        tr["sl_moved_to_be"] = True
+        if 1 not in tr.get("tp_fills_list", []):
+            tr.setdefault("tp_fills_list", []).append(1)
+            tr["tp_fills"] = len(tr["tp_fills_list"])
+        self.log.info(f"SL -> BE (fallback) {tr['symbol']} @ {be}")
+        return True
 
     def cancel_expired_entries(self) -> None:
         """Cancel entries that haven't filled within timeout."""
         now = time.time()
-        for tid, tr in list(self.state.get("open_trades", {}).items()):
-            if tr.get("status") != "pending":
-                continue
+        for tid, tr in self._trades_with_status("pending"):
             placed = float(tr.get("placed_ts") or 0)
             if placed and now - placed > ENTRY_EXPIRATION_MIN * 60:
-                oid = tr.get("entry_order_id")
-                if oid and oid != "DRY_RUN":
-                    try:
-                        self.cancel_entry(tr["symbol"], oid)
-                        self.log.info(f"Canceled expired entry {tr['symbol']} ({tid})")
-                    except Exception as e:
-                        self.log.warning(f"Cancel failed {tr['symbol']}: {e}")
-                tr["status"] = "expired"
+                with self.trade_lock(tid):
+                    if tr.get("status") != "pending":
+                        continue  # filled while we were waiting for the lock
+                    oid = tr.get("entry_order_id")
+                    if oid and oid != "DRY_RUN":
+                        try:
+                            self.cancel_entry(tr["symbol"], oid)
+                            self.log.info(f"Canceled expired entry {tr['symbol']} ({tid})")
+                        except Exception as e:
+                            self.log.warning(f"Cancel failed {tr['symbol']}: {e}")
+                    self.set_status(tr, "expired")
 
     def check_position_alerts(self) -> None:
         """Check positions and send Telegram alerts if thresholds crossed."""
         if not telegram_alerts.is_enabled():
             return
 
-        for tid, tr in list(self.state.get("open_trades", {}).items()):
-            if tr.get("status") != "open":
-                continue
-
+        for tid, tr in self._trades_with_status("open"):
             symbol = tr["symbol"]
             side = tr["order_side"]
             avg_entry = float(tr.get("entry_price") or 0)
@@ -760,7 +1145,7 @@ class TradeEngine:
                 continue
 
             try:
-                current_price = self.bybit.last_price(CATEGORY, symbol)
+                current_price = self._price(symbol)
                 if not current_price:
                     continue
 
@@ -778,69 +1163,98 @@ class TradeEngine:
                 self.log.debug(f"Position alert check failed for {symbol}: {e}")
 
     def cleanup_closed_trades(self) -> None:
-        """Remove trades from state if position is closed."""
-        for tid, tr in list(self.state.get("open_trades", {}).items()):
-            if tr.get("status") not in ("open",):
-                continue
+        """Remove trades from state if position is closed.
+
+        Only trades marked dirty by a closing execution are checked, plus every
+        open trade once per CLEANUP_FULL_SWEEP_SEC.
+        """
+        now = time.time()
+        full_sweep = now - self._last_full_cleanup >= CLEANUP_FULL_SWEEP_SEC
+        with self.trades_lock:
+            dirty, self._dirty_trades = self._dirty_trades, set()
+            if full_sweep:
+                open_trades = self.trades_with_status("open")
+            else:
+                by_id = self._by_status.get("open", {})
+                open_trades = [(tid, by_id[tid]) for tid in dirty if tid in by_id]
+        sizes: Dict[str, float] = {}
+        if open_trades:
+            try:
+                # One position/list call covers every open trade
+                sizes = {p.symbol: p.size for p in self.bybit.positions(CATEGORY)}
+                if full_sweep:
+                    self._last_full_cleanup = now
+            except Exception as e:
+                self.log.warning(f"Cleanup position fetch failed: {e}")
+                open_trades = []
+                with self.trades_lock:
+                    self._dirty_trades |= dirty
+        elif full_sweep:
+            self._last_full_cleanup = now
+
+        for tid, tr in open_trades:
             try:
-                size, _ = self.position_size_avg(tr["symbol"])
-                if size == 0:
-                    self._cancel_all_trade_orders(tr)
-                    tr["status"] = "closed"
-                    tr["closed_ts"] = time.time()
-                    self._fetch_and_store_trade_stats(tr)
-
-                    if sheets_export.is_enabled():
-                        self._export_trade_to_sheets(tr)
-
-                    telegram_alerts.send_trade_closed(
-                        symbol=tr["symbol"],
-                        side=tr["order_side"],
-                        pnl=tr.get("realized_pnl", 0),
-                        exit_reason=tr.get("exit_reason", "unknown"),
-                        tp_fills=tr.get("tp_fills", 0),
-                        dca_fills=0,
-                    )
-                    telegram_alerts.clear_alerts_for_trade(tid)
-                    self.log.info(f"TRADE CLOSED {tr['symbol']} ({tid})")
+                if sizes.get(tr["symbol"], 0.0) == 0:
+                    with self.trade_lock(tid):
+                        if tr.get("status") != "open":
+                            continue
+                        self._cancel_all_trade_orders(tr)
+                        self.set_status(tr, "closed")
+                        tr["closed_ts"] = time.time()
+                        self._fetch_and_store_trade_stats(tr)
+
+                        if sheets_export.is_enabled():
+                            self._export_trade_to_sheets(tr)
+
+                        telegram_alerts.send_trade_closed(
+                            symbol=tr["symbol"],
+                            side=tr["order_side"],
+                            pnl=tr.get("realized_pnl", 0),
+                            exit_reason=tr.get("exit_reason", "unknown"),
+                            tp_fills=tr.get("tp_fills", 0),
+                            dca_fills=0,
+                        )
+                        telegram_alerts.clear_alerts_for_trade(tid)
+                        self.log.info(f"TRADE CLOSED {tr['symbol']} ({tid})")
             except Exception as e:
                 self.log.warning(f"Cleanup check failed for {tr['symbol']}: {e}")
 
-        # Prune old closed/expired trades
+        # Prune old closed/expired trades: walk the partitions in place and
+        # remove afterwards, so no snapshot copy is needed
         cutoff = time.time() - 86400
-        for tid, tr in list(self.state.get("open_trades", {}).items()):
-            if tr.get("status") in ("closed", "expired"):
-                closed_at = tr.get("closed_ts") or tr.get("placed_ts") or 0
-                if closed_at < cutoff:
-                    self._archive_trade(tr)
-                    del self.state["open_trades"][tid]
+        with self.trades_lock:
+            to_del = []
+            for status in ("closed", "expired"):
+                for tid, tr in self._by_status.get(status, {}).items():
+                    if (tr.get("closed_ts") or tr.get("placed_ts") or 0) < cutoff:
+                        to_del.append(tid)
+            for tid in to_del:
+                self._archive_trade(self._remove_trade(tid))
 
     def _cancel_all_trade_orders(self, trade: Dict[str, Any]) -> None:
-        """Cancel all pending orders for a closed trade."""
+        """Cancel all pending orders for a closed trade.
+
+        Only the bot's own orders, by orderLinkId in cancel-batch requests;
+        manual orders on the same symbol are left alone.
+        """
         if DRY_RUN:
             return
 
         symbol = trade["symbol"]
         trade_id = trade["id"]
+        # Links already confirmed cancelled are gone from the map; the rest may
+        # since have filled, which comes back as a per-order error
+        links = [l for l in self._order_links(trade) if self._order_to_trade.get(l) == trade_id]
 
         try:
-            open_orders = self.bybit.open_orders(CATEGORY, symbol)
             cancelled = 0
-
-            for order in open_orders:
-                link_id = order.get("orderLinkId") or ""
-                if link_id.startswith(trade_id + ":"):
-                    order_id = order.get("orderId")
-                    if order_id:
-                        try:
-                            self.bybit.cancel_order({
-                                "category": CATEGORY,
-                                "symbol": symbol,
-                                "orderId": order_id
-                            })
-                            cancelled += 1
-                        except Exception:
-                            pass
+            for i in range(0, len(links), 20):
+                chunk = links[i:i + 20]
+                resp = self.bybit.cancel_batch_orders(CATEGORY, symbol, chunk, id_field="orderLinkId")
+                errors = (resp.get("retExtInfo") or {}).get("list") or []
+                cancelled += sum(1 for e in errors if e.get("code") in (0, "0"))
+            for link in links:
+                self._order_to_trade.pop(link, None)
 
             if cancelled > 0:
                 self.log.info(f"Cleaned up {cancelled} pending order(s) for {symbol}")
@@ -849,48 +1263,61 @@ class TradeEngine:
             self.log.warning(f"Failed to cleanup orders for {symbol}: {e}")
 
     def _export_trade_to_sheets(self, trade: Dict[str, Any]) -> None:
-        """Export trade to Google Sheets."""
-        try:
-            entry_price = trade.get("entry_price") or trade.get("trigger") or 0
-            base_qty = trade.get("base_qty") or 0
-            margin_used = (entry_price * base_qty) / LEVERAGE if entry_price and base_qty else 0
+        """Queue a closed trade for the Google Sheets export worker."""
+        entry_price = trade.get("entry_price") or trade.get("trigger") or 0
+        base_qty = trade.get("base_qty") or 0
+        margin_used = (entry_price * base_qty) / LEVERAGE if entry_price and base_qty else 0
+
+        export_data = asdict(TradeRecord.from_trade(trade))
+        export_data.update(
+            entry_price=entry_price,
+            margin_used=margin_used,
+            equity_at_close=0,  # filled in by the worker
+        )
 
-            equity_at_close = 0
-            try:
-                equity_at_close = self.bybit.wallet_equity(ACCOUNT_TYPE)
-            except Exception:
-                pass
-
-            tp_count = len(trade.get("tp_prices") or [])
-
-            export_data = {
-                "id": trade.get("id"),
-                "symbol": trade.get("symbol"),
-                "side": trade.get("pos_side"),
-                "entry_price": entry_price,
-                "trigger": trade.get("trigger"),
-                "placed_ts": trade.get("placed_ts"),
-                "filled_ts": trade.get("filled_ts"),
-                "closed_ts": trade.get("closed_ts"),
-                "realized_pnl": trade.get("realized_pnl"),
-                "margin_used": margin_used,
-                "equity_at_close": equity_at_close,
-                "is_win": trade.get("is_win"),
-                "exit_reason": trade.get("exit_reason"),
-                "tp_fills": trade.get("tp_fills", 0),
-                "tp_count": tp_count,
-                "dca_fills": 0,
-                "dca_count": 0,
-                "trailing_used": trade.get("trailing_started", False),
-            }
+        try:
+            self._sheets_q.put_nowait(export_data)
+        except queue.Full:
+            self.log.warning(f"Google Sheets export queue full, dropping {trade.get('id')}")
+
+    def _sheets_worker(self) -> None:
+        """Drain the export queue: up to 50 rows per append, one equity fetch per batch."""
+        stopping = False
+        while True:
+            batch: List[Dict[str, Any]] = []
+            while len(batch) < 50:
+                try:
+                    # Block only for a batch's first row, and never once stopping
+                    item = self._sheets_q.get(block=not batch and not stopping)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
 
-            if sheets_export.export_trade(export_data):
-                self.log.info(f"Trade exported to Google Sheets")
-        except Exception as e:
-            self.log.warning(f"Google Sheets export error: {e}")
+            if batch:
+                try:
+                    equity = self._equity()
+                except Exception:
+                    equity = 0
+                for row in batch:
+                    row["equity_at_close"] = equity
+                try:
+                    if sheets_export.export_trades_batch(batch):
+                        self.log.info(f"{len(batch)} trade(s) exported to Google Sheets")
+                except Exception as e:
+                    self.log.warning(f"Google Sheets export error: {e}")
+            elif stopping:
+                return
 
     def _fetch_and_store_trade_stats(self, trade: Dict[str, Any]) -> None:
-        """Fetch final PnL from Bybit."""
+        """Fetch final PnL from Bybit; stamps realized_pnl, is_win, tp_count, exit_reason."""
+        # Read by the exit reason, summary, export and archive that follow
+        trade["tp_count"] = len(trade.get("tp_prices") or [])
+        trade["is_win"] = False
+        trade["exit_code"] = EXIT_UNKNOWN
+
         if DRY_RUN:
             trade["realized_pnl"] = 0.0
             trade["exit_reason"] = "dry_run"
@@ -900,18 +1327,27 @@ class TradeEngine:
         filled_ts = trade.get("filled_ts") or trade.get("placed_ts") or 0
 
         try:
-            start_time = int((filled_ts - 60) * 1000) if filled_ts else None
-            pnl_records = self.bybit.closed_pnl(CATEGORY, symbol, start_time=start_time, limit=20)
-
-            total_pnl = 0.0
-            for rec in pnl_records:
-                rec_time = int(rec.get("createdTime") or 0)
-                if rec_time >= int(filled_ts * 1000):
-                    total_pnl += float(rec.get("closedPnl") or 0)
+            entry_qty = trade.get("ws_entry_qty", 0.0)
+            if entry_qty and abs(trade.get("ws_closed_qty", 0.0) - entry_qty) <= entry_qty * 0.001:
+                # Every fill of the position, in and out, came in on the execution
+                # stream. execPnl is gross, closedPnl is net of the open and close
+                # fees, so the fees come off here.
+                total_pnl = trade.get("ws_realized_pnl", 0.0) - trade.get("ws_fees", 0.0)
+            else:
+                # Records from the fill until now: one per TP plus the SL/trailing
+                # close, so a page of tp_count + 2 is normally the whole answer
+                # (Bybit caps the window at 7 days)
+                start_time = int(filled_ts * 1000) if filled_ts else None
+                end_time = int(time.time() * 1000)
+                if start_time:
+                    end_time = min(end_time, start_time + 7 * 86400 * 1000 - 1)
+                pnl_records = self.bybit.closed_pnl(CATEGORY, symbol, start_time=start_time,
+                                                    limit=trade["tp_count"] + 2, end_time=end_time)
+                total_pnl = sum(float(rec.get("closedPnl") or 0) for rec in pnl_records)
 
             trade["realized_pnl"] = total_pnl
             trade["is_win"] = total_pnl > 0
-            trade["exit_reason"] = self._determine_exit_reason(trade)
+            trade["exit_reason"], trade["exit_code"] = self._determine_exit_reason(trade)
             self._log_trade_summary(trade)
 
         except Exception as e:
@@ -919,90 +1355,123 @@ class TradeEngine:
             trade["realized_pnl"] = None
             trade["exit_reason"] = "unknown"
 
-    def _determine_exit_reason(self, trade: Dict[str, Any]) -> str:
-        """Determine how the trade was closed."""
+    def _determine_exit_reason(self, trade: Dict[str, Any]) -> Tuple[str, int]:
+        """Determine how the trade was closed: (exit_reason, exit code), via _EXIT_TABLE."""
         tp_fills = trade.get("tp_fills", 0)
-        tp_count = len(trade.get("tp_prices") or [])
-        trailing_started = trade.get("trailing_started", False)
-        sl_moved_to_be = trade.get("sl_moved_to_be", False)
         pnl = trade.get("realized_pnl", 0)
-
-        if trailing_started and pnl and pnl > 0:
-            return "trailing_stop"
-        elif tp_fills >= tp_count:
-            return "all_tps_hit"
-        elif tp_fills > 0 and sl_moved_to_be and pnl is not None and abs(pnl) < 1:
-            return "breakeven"
-        elif tp_fills > 0:
-            return f"tp{tp_fills}_then_sl"
-        elif pnl and pnl < 0:
-            return "stop_loss"
-        else:
-            return "unknown"
+        known = pnl is not None
+        code = _EXIT_TABLE[(
+            known and pnl > 0,
+            known and pnl < 0,
+            known and abs(pnl) < 1,
+            bool(trade.get("trailing_started", False)),
+            tp_fills >= trade.get("tp_count", 0),
+            tp_fills > 0,
+            bool(trade.get("sl_moved_to_be", False)),
+        )]
+        if code == EXIT_TP_THEN_SL:
+            return f"tp{tp_fills}_then_sl", code
+        return _EXIT_REASON[code], code
 
     def _log_trade_summary(self, trade: Dict[str, Any]) -> None:
         """Log a trade summary."""
+        if not self.log.isEnabledFor(logging.INFO):
+            return
         symbol = trade["symbol"]
         side = trade.get("pos_side", "")
         entry = trade.get("entry_price", trade.get("trigger"))
         pnl = trade.get("realized_pnl", 0) or 0
         exit_reason = trade.get("exit_reason", "unknown")
         tp_fills = trade.get("tp_fills", 0)
-        tp_count = len(trade.get("tp_prices") or [])
-        is_win = pnl > 0
+        tp_count = trade.get("tp_count", 0)
+        is_win = trade.get("is_win")
 
         emoji = "WIN" if is_win else "LOSS"
 
         self.log.info("")
         self.log.info("=" * 50)
-        self.log.info(f"TRADE {emoji}: {symbol} {side}")
+        self.log.info("TRADE %s: %s %s", emoji, symbol, side)
         self.log.info("=" * 50)
-        self.log.info(f"   Entry: ${entry:.6f}")
-        self.log.info(f"   PnL: ${pnl:.2f} USDT")
-        self.log.info(f"   TPs Hit: {tp_fills}/{tp_count}")
-        self.log.info(f"   Exit: {exit_reason}")
+        self.log.info("   Entry: $%.6f", entry)
+        self.log.info("   PnL: $%.2f USDT", pnl)
+        self.log.info("   TPs Hit: %s/%s", tp_fills, tp_count)
+        self.log.info("   Exit: %s", exit_reason)
         self.log.info("=" * 50)
         self.log.info("")
 
     def _archive_trade(self, trade: Dict[str, Any]) -> None:
-        """Archive trade to history."""
-        history = self.state.setdefault("trade_history", [])
-
-        archived = {
-            "id": trade.get("id"),
-            "symbol": trade.get("symbol"),
-            "side": trade.get("pos_side"),
-            "entry_price": trade.get("entry_price"),
-            "trigger": trade.get("trigger"),
-            "placed_ts": trade.get("placed_ts"),
-            "filled_ts": trade.get("filled_ts"),
-            "closed_ts": trade.get("closed_ts"),
-            "realized_pnl": trade.get("realized_pnl"),
-            "is_win": trade.get("is_win"),
-            "exit_reason": trade.get("exit_reason"),
-            "tp_fills": trade.get("tp_fills", 0),
-            "tp_count": len(trade.get("tp_prices") or []),
-            "dca_fills": 0,
-            "dca_count": 0,
-            "trailing_used": trade.get("trailing_started", False),
-        }
-        history.append(archived)
-
-        if len(history) > 500:
-            self.state["trade_history"] = history[-500:]
+        """Archive an (already removed) trade to history as its TradeRecord."""
+        rec = TradeRecord.from_trade(trade)
+        self.state["trade_history"].append(rec)
+        self._add_to_day_stats(rec)
+
+    def _add_to_day_stats(self, t: TradeRecord) -> None:
+        """Fold an archived trade into its close day's stats bucket."""
+        day = utc_day_key(t.closed_ts or t.placed_ts or 0)
+        b = self.state["stats_by_day"].get(day)
+        if b is None:
+            bisect.insort(self._day_keys, day)
+            b = self.state["stats_by_day"][day] = {
+                "trades": 0, "wins": 0, "pnl": 0.0, "best": None, "worst": None,
+                "tp_fills": 0, "trailing_exits": 0, "sl_exits": 0, "be_exits": 0,
+            }
+        pnl = t.realized_pnl or 0
+        code = t.exit_code
+        if code is None:
+            code = _EXIT_CODE_BY_REASON.get(t.exit_reason, EXIT_UNKNOWN)
+        b["trades"] += 1
+        b["wins"] += 1 if t.is_win else 0
+        b["pnl"] += pnl
+        if b["best"] is None or pnl > b["best"]:
+            b["best"] = pnl
+        if b["worst"] is None or pnl < b["worst"]:
+            b["worst"] = pnl
+        b["tp_fills"] += t.tp_fills or 0
+        b["trailing_exits"] += code == EXIT_TRAILING
+        b["sl_exits"] += code == EXIT_SL
+        b["be_exits"] += code == EXIT_BREAKEVEN
 
     def get_trade_stats(self, days: Optional[int] = None) -> Dict[str, Any]:
-        """Calculate trade statistics."""
-        history = self.state.get("trade_history", [])
-        now = time.time()
+        """Trade statistics for the last `days` UTC days (today included), or all time.
+
+        Sums the per-day buckets kept by _add_to_day_stats: O(days), not O(trades).
+        """
+        with self.trades_lock:
+            return self._stats_from_buckets(self._day_buckets(days), days)
 
+    def _day_buckets(self, days: Optional[int]) -> List[Dict[str, Any]]:
+        """Stats buckets of the last `days` UTC days, or all (caller holds trades_lock)."""
+        by_day = self.state["stats_by_day"]
+        start = 0
         if days:
-            cutoff = now - (days * 86400)
-            trades = [t for t in history if (t.get("closed_ts") or 0) >= cutoff]
-        else:
-            trades = history
+            start = bisect.bisect_left(self._day_keys, utc_day_key(time.time() - (days - 1) * 86400))
+        return [by_day[k] for k in self._day_keys[start:]]
 
-        if not trades:
+    @staticmethod
+    def _stats_from_buckets(buckets: List[Dict[str, Any]], days: Optional[int]) -> Dict[str, Any]:
+        """Combine day buckets into the stats dict get_trade_stats returns."""
+        # One pass, all counters in locals (best/worst are only read if total > 0)
+        total = wins = tp_fills = trailing = sl = be = 0
+        pnl = 0.0
+        best = -math.inf
+        worst = math.inf
+        for b in buckets:
+            n = b["trades"]
+            if not n:
+                continue
+            total += n
+            wins += b["wins"]
+            pnl += b["pnl"]
+            tp_fills += b["tp_fills"]
+            trailing += b["trailing_exits"]
+            sl += b["sl_exits"]
+            be += b["be_exits"]
+            if b["best"] > best:
+                best = b["best"]
+            if b["worst"] < worst:
+                worst = b["worst"]
+
+        if not total:
             return {
                 "period_days": days or "all",
                 "total_trades": 0,
@@ -1019,57 +1488,52 @@ class TradeEngine:
                 "be_exits": 0,
             }
 
-        wins = [t for t in trades if t.get("is_win")]
-        pnls = [t.get("realized_pnl") or 0 for t in trades]
-        tp_fills = [t.get("tp_fills") or 0 for t in trades]
-
-        exit_reasons = [t.get("exit_reason") or "" for t in trades]
-        trailing_exits = sum(1 for r in exit_reasons if r == "trailing_stop")
-        sl_exits = sum(1 for r in exit_reasons if r == "stop_loss")
-        be_exits = sum(1 for r in exit_reasons if r == "breakeven")
-
         return {
             "period_days": days or "all",
-            "total_trades": len(trades),
-            "wins": len(wins),
-            "losses": len(trades) - len(wins),
-            "win_rate": round(len(wins) / len(trades) * 100, 1) if trades else 0.0,
-            "total_pnl": round(sum(pnls), 2),
-            "avg_pnl": round(sum(pnls) / len(trades), 2) if trades else 0.0,
-            "best_trade": round(max(pnls), 2) if pnls else 0.0,
-            "worst_trade": round(min(pnls), 2) if pnls else 0.0,
-            "avg_tp_fills": round(sum(tp_fills) / len(trades), 1) if trades else 0.0,
-            "trailing_exits": trailing_exits,
-            "sl_exits": sl_exits,
-            "be_exits": be_exits,
+            "total_trades": total,
+            "wins": wins,
+            "losses": total - wins,
+            "win_rate": round(wins / total * 100, 1),
+            "total_pnl": round(pnl, 2),
+            "avg_pnl": round(pnl / total, 2),
+            "best_trade": round(best, 2),
+            "worst_trade": round(worst, 2),
+            "avg_tp_fills": round(tp_fills / total, 1),
+            "trailing_exits": trailing,
+            "sl_exits": sl,
+            "be_exits": be,
         }
 
     def log_performance_report(self) -> None:
         """Log performance report."""
-        stats_7d = self.get_trade_stats(7)
-        stats_30d = self.get_trade_stats(30)
-        stats_all = self.get_trade_stats()
-
-        self.log.info("")
-        self.log.info("=" * 60)
-        self.log.info("PERFORMANCE REPORT")
-        self.log.info("=" * 60)
-
-        for label, stats in [("7 Days", stats_7d), ("30 Days", stats_30d), ("All Time", stats_all)]:
-            if stats["total_trades"] == 0:
-                self.log.info(f"\n{label}: No trades")
-                continue
-
-            self.log.info(f"\n{label}:")
-            self.log.info(f"   Trades: {stats['total_trades']} | Wins: {stats['wins']} | Losses: {stats['losses']}")
-            self.log.info(f"   Win Rate: {stats['win_rate']}%")
-            self.log.info(f"   Total PnL: ${stats['total_pnl']:.2f} | Avg: ${stats['avg_pnl']:.2f}")
-            self.log.info(f"   Best: ${stats['best_trade']:.2f} | Worst: ${stats['worst_trade']:.2f}")
-            self.log.info(f"   Avg TPs Hit: {stats['avg_tp_fills']:.1f}")
-            self.log.info(f"   Exits: {stats['trailing_exits']} trailing, {stats['sl_exits']} SL, {stats['be_exits']} BE")
+        with self.trades_lock:
+            stats_7d = self._stats_from_buckets(self._day_buckets(7), 7)
+            stats_30d = self._stats_from_buckets(self._day_buckets(30), 30)
+            stats_all = self._stats_from_buckets(self._day_buckets(None), None)
+
+        if self.log.isEnabledFor(logging.INFO):
+            self.log.info("")
+            self.log.info("=" * 60)
+            self.log.info("PERFORMANCE REPORT")
+            self.log.info("=" * 60)
+
+            for label, stats in [("7 Days", stats_7d), ("30 Days", stats_30d), ("All Time", stats_all)]:
+                if stats["total_trades"] == 0:
+                    self.log.info("\n%s: No trades", label)
+                    continue
 
-        self.log.info("")
-        self.log.info("=" * 60)
+                self.log.info("\n%s:", label)
+                self.log.info("   Trades: %s | Wins: %s | Losses: %s",
+                              stats["total_trades"], stats["wins"], stats["losses"])
+                self.log.info("   Win Rate: %s%%", stats["win_rate"])
+                self.log.info("   Total PnL: $%.2f | Avg: $%.2f", stats["total_pnl"], stats["avg_pnl"])
+                self.log.info("   Best: $%.2f | Worst: $%.2f", stats["best_trade"], stats["worst_trade"])
+                self.log.info("   Avg TPs Hit: %.1f", stats["avg_tp_fills"])
+                self.log.info("   Exits: %s trailing, %s SL, %s BE",
+                              stats["trailing_exits"], stats["sl_exits"], stats["be_exits"])
+
+            self.log.info("")
+            self.log.info("=" * 60)
 
         if sheets_export.is_enabled():
             sheets_export.export_stats_summary(stats_7d, stats_30d, stats_all)